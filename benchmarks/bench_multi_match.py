@@ -0,0 +1,79 @@
+"""Benchmark of `MultiMatcher`: one `in` per literal versus the Aho-Corasick automaton.
+
+The literals are searched in the running-config of synthetic IOS-XE logs, half of
+them being lines of the log and half absent, for an increasing number of literals.
+The best time of each method is reported, with the number of literals from which
+the automaton is faster: `multi_match.MIN_PATTERNS` is set from it.
+
+Usage (from the root of the repository):
+    python -m benchmarks.bench_multi_match
+    python -m benchmarks.bench_multi_match --size large --counts 100,200,400
+"""
+
+import contextlib
+import random
+import sys
+import time
+
+import typer
+
+from benchmarks.synthetic_logs import SIZES, generate_log
+from modules.multi_match import MIN_PATTERNS, AhoCorasick
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+DEFAULT_COUNTS = "10,25,50,100,150,200,250,300,400,600,800"
+
+app = typer.Typer(add_completion=False)
+
+
+def best_time(func, repeat: int = 5) -> float:
+    """Return the best time (s) of `func()` over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def literals_of(text: str, count: int, seed: int = 0) -> list:
+    """Return `count` distinct literals, half of them lines of `text` and half absent from it."""
+    rng = random.Random(seed)
+    lines = list(dict.fromkeys(line.strip() for line in text.splitlines() if line.strip()))
+    present = rng.sample(lines, min(count // 2, len(lines)))
+    return present + [f"absent literal {index}" for index in range(count - len(present))]
+
+
+@app.command()
+def main(
+    size: str = typer.Option("medium", "--size", "-s", help=f"Size of the log, in {list(SIZES)}"),
+    counts: str = typer.Option(DEFAULT_COUNTS, "--counts", help="Numbers of literals benchmarked, comma separated"),
+    seed: int = typer.Option(0, "--seed", help="Seed of the synthetic log and of the literals"),
+    repeat: int = typer.Option(5, "--repeat", "-r", help="Number of runs, the best one is kept"),
+):
+    """Find from how many literals the Aho-Corasick automaton beats one `in` per literal."""
+    if size not in SIZES:
+        print(f"##ERR## Unknown size: {size}")
+        sys.exit(2)
+    text = generate_log("ios-xe", size, seed)["text"]
+    print(f"\n{len(text) / 1024:.0f} KB of text, MIN_PATTERNS = {MIN_PATTERNS}")
+    print(f"{'LITERALS':>9}{'IN (ms)':>10}{'AHO-CORASICK (ms)':>19}")
+    crossover = None
+    for count in (int(count) for count in counts.split(",")):
+        literals = literals_of(text, count, seed)
+        automaton = AhoCorasick(literals)
+        plain = best_time(lambda: {literal for literal in literals if literal in text}, repeat)
+        scan = best_time(lambda: automaton.find(text), repeat)
+        print(f"{count:>9}{plain * 1000:>10.2f}{scan * 1000:>19.2f}")
+        if crossover is None and scan < plain:
+            crossover = count
+    if crossover is None:
+        print("\nThe automaton is slower for all these numbers of literals")
+    else:
+        print(f"\nThe automaton is faster from {crossover} literals")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,163 @@
+"""Throughput benchmark of the log parsers, on synthetic logs.
+
+Each parser runs on a set of logs made by `synthetic_logs` for its family, per size
+of log, and the best of a few runs is reported in MB/s and devices/s. The results
+can be saved as the baseline, and the next runs are compared to it, so a regex
+change making a parser much slower is visible. The number of rows found is compared
+as well: a parser which gets faster by missing rows is a regression too.
+
+Usage (from the root of the repository):
+    python -m benchmarks.bench_parsers
+    python -m benchmarks.bench_parsers --save-baseline
+    python -m benchmarks.bench_parsers --parser nxos_temperature --size large
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+
+import typer
+
+from benchmarks.synthetic_logs import SIZES, generate_log
+from modules.logs_cve_2024_3400 import pan_os_config_cve_2024_3400
+from modules.logs_intf_pause_txrx import nx_os_interfaces_pause_txrx
+from modules.logs_os_details import os_details
+from modules.logs_password_encryption import iosxr_password_encryption
+from modules.logs_temperature import iosxe_temperature, junos_temperature, nxos_temperature
+from modules.normalisation import normalise_text
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+PROMPT_DELIMITER = "(#|>)"
+
+# Parser benchmarked: (family of the logs, function called with the log and the prompt delimiter)
+PARSERS = {
+    "iosxe_temperature": ("ios-xe", iosxe_temperature),
+    "nxos_temperature": ("nx-os", nxos_temperature),
+    "junos_temperature": ("junos", junos_temperature),
+    "iosxr_password_encryption": ("ios-xr", iosxr_password_encryption),
+    "pan_os_config_cve_2024_3400": (
+        "pan-os",
+        lambda log, prompt_delimiter: pan_os_config_cve_2024_3400(log, prompt_delimiter, log["version"]),
+    ),
+    "arubasw_os_details": ("arubasw", os_details),
+    "nx_os_interfaces_pause_txrx": ("nx-os", nx_os_interfaces_pause_txrx),
+}
+
+# Number of logs parsed per run, for each size of log
+DEVICES = {"small": 50, "medium": 10, "large": 3}
+
+app = typer.Typer(add_completion=False)
+
+
+def bench_parser(parser, logs: list, repeat: int = 3) -> tuple:
+    """Return the best time (s) taken by `parser` to parse all the logs over `repeat` runs, and the rows found.
+
+    The logs are copied for each run, so the index of the command sections is built
+    every time, as it is for a freshly downloaded log.
+    """
+    best = float("inf")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            copies = [dict(log) for log in logs]
+            start = time.perf_counter()
+            outputs = [parser(log, PROMPT_DELIMITER) for log in copies]
+            best = min(best, time.perf_counter() - start)
+    return best, sum(count_rows(output) for output in outputs)
+
+
+def count_rows(output) -> int:
+    """Return the number of rows of a parser output.
+
+    The parsers return a list of rows, or a dict of the rows found for the device
+    (`{device: [rows]}`, `{device: "no match"}` when nothing is found).
+    """
+    if isinstance(output, list):
+        return len(output)
+    if isinstance(output, dict):
+        return sum(len(rows) for rows in output.values() if isinstance(rows, list))
+    return 0
+
+
+def run_benchmarks(parsers: list, sizes: list, seed: int = 0, repeat: int = 3) -> dict:
+    """Return the throughput of each parser for each size of log, keyed `parser/size`."""
+    results = {}
+    for name in parsers:
+        family, parser = PARSERS[name]
+        for size in sizes:
+            logs = [generate_log(family, size, seed, index) for index in range(DEVICES[size])]
+            # the parsers get the normalised text, as `iter_logs` hands it to the checks
+            for log in logs:
+                log["text"] = normalise_text(log["text"])
+            megabytes = sum(len(log["text"].encode("utf-8")) for log in logs) / 1024 / 1024
+            elapsed, rows = bench_parser(parser, logs, repeat)
+            results[f"{name}/{size}"] = {
+                "rows": rows,
+                "mb_per_s": round(megabytes / elapsed, 2),
+                "devices_per_s": round(len(logs) / elapsed, 1),
+                "mb_per_log": round(megabytes / len(logs), 3),
+            }
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return the `parser/size` whose MB/s dropped by more than `tolerance` from the baseline, or whose rows changed."""
+    return [
+        key
+        for key, result in results.items()
+        if key in baseline
+        and (
+            result["mb_per_s"] < baseline[key]["mb_per_s"] * (1 - tolerance)
+            or result["rows"] != baseline[key].get("rows", result["rows"])
+        )
+    ]
+
+
+@app.command()
+def main(
+    parser: list[str] = typer.Option(None, "--parser", "-p", help="Parser to benchmark (default: all of them)"),
+    size: list[str] = typer.Option(None, "--size", "-s", help=f"Size of the logs, in {list(SIZES)} (default: all)"),
+    seed: int = typer.Option(0, "--seed", help="Seed of the synthetic logs"),
+    repeat: int = typer.Option(3, "--repeat", "-r", help="Number of runs, the best one is kept"),
+    baseline_file: str = typer.Option(DEFAULT_BASELINE, "--baseline", help="Baseline file to compare with"),
+    save_baseline: bool = typer.Option(False, "--save-baseline", help="Save the results as the new baseline"),
+    tolerance: float = typer.Option(0.3, "--tolerance", help="Slowdown from the baseline reported as a regression"),
+):
+    """Benchmark the throughput of the log parsers on synthetic logs."""
+    parsers = parser or list(PARSERS)
+    sizes = size or list(SIZES)
+    if unknown := [name for name in parsers if name not in PARSERS] + [name for name in sizes if name not in SIZES]:
+        print(f"##ERR## Unknown parser / size: {', '.join(unknown)}")
+        sys.exit(2)
+
+    results = run_benchmarks(parsers, sizes, seed, repeat)
+    baseline = {}
+    if os.path.exists(baseline_file):
+        with open(baseline_file) as file:
+            baseline = json.load(file)
+
+    print(f"\n{'PARSER/SIZE':<42}{'MB/LOG':>9}{'MB/S':>10}{'DEVICES/S':>12}{'ROWS':>8}{'BASELINE':>11}")
+    for key, result in results.items():
+        versus = ""
+        if key in baseline:
+            versus = f"{(result['mb_per_s'] / baseline[key]['mb_per_s'] - 1) * 100:+.0f}%"
+        print(
+            f"{key:<42}{result['mb_per_log']:>9}{result['mb_per_s']:>10}{result['devices_per_s']:>12}"
+            f"{result['rows']:>8}{versus:>11}"
+        )
+
+    if save_baseline:
+        with open(baseline_file, "w") as file:
+            json.dump({**baseline, **results}, file, indent=4, sort_keys=True)
+        print(f"\nBaseline written to {baseline_file}")
+    elif regressions := compare(results, baseline, tolerance):
+        print(f"\n##ERR## More than {tolerance:.0%} slower than the baseline, or other rows found: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    app()
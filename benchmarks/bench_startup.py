@@ -0,0 +1,121 @@
+"""Startup time benchmark of the CLI: `import search_logs`, and `search_logs.py --help`.
+
+Each command is started in a fresh interpreter a few times, and the best time is
+reported, with the slowest imports of the startup (`python -X importtime`). The
+modules of the checks and the heavy dependencies (pandas, the IP Fabric SDK, tqdm...)
+are imported when a check runs, not at startup: the command fails if one of them is
+imported by `import search_logs`, or if the startup is slower than `--max-ms`.
+
+Usage (from the root of the repository):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --max-ms 250 --top 20
+"""
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+import typer
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Commands timed, run with the interpreter from the root of the repository
+COMMANDS = {
+    "import search_logs": ["-c", "import search_logs"],
+    "search_logs.py --help": ["search_logs.py", "--help"],
+}
+
+# Modules which must not be imported at startup, with their submodules
+LAZY_MODULES = ("pandas", "pyarrow", "ipfabric", "tqdm", "http.server", "modules.service", "modules.archive")
+# Prefix of the modules of the checks
+CHECK_MODULES = "modules.logs_"
+
+app = typer.Typer(add_completion=False)
+
+
+def time_command(args: list, repeat: int = 5) -> float:
+    """Return the best time (s) taken by the interpreter to run `args`, over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def slowest_imports(top: int = 10) -> list:
+    """Return the (cumulative ms, module) of the `top` slowest modules imported by `search_logs` itself."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import search_logs"], cwd=ROOT, capture_output=True, text=True
+    )
+    imports, children = [], []
+    # lines "import time: <self us> | <cumulative us> | <module>", the module indented by
+    # its depth, and listed after the modules it imports
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000, module.strip()))
+        elif depth == 0:
+            if module.strip() == "search_logs":
+                imports = children
+            children = []
+    return sorted(imports, reverse=True)[:top]
+
+
+def eager_imports() -> list:
+    """Return the modules imported by `import search_logs` which should only be imported when used."""
+    process = subprocess.run(
+        [sys.executable, "-c", "import json, sys, search_logs; print(json.dumps(sorted(sys.modules)))"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [
+        module
+        for module in json.loads(process.stdout)
+        if module.startswith(CHECK_MODULES)
+        or any(module == lazy or module.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+    ]
+
+
+@app.command()
+def main(
+    repeat: int = typer.Option(5, "--repeat", "-r", help="Number of runs of each command, the best one is kept"),
+    top: int = typer.Option(10, "--top", help="Number of the slowest imports listed"),
+    max_ms: float = typer.Option(None, "--max-ms", help="Startup time (ms) reported as a regression (default: none)"),
+):
+    """Benchmark the startup time of the CLI, and check nothing heavy is imported at startup."""
+    print(f"\n{'COMMAND':<32}{'BEST (ms)':>10}")
+    timings = {}
+    for name, args in COMMANDS.items():
+        timings[name] = time_command(args, repeat) * 1000
+        print(f"{name:<32}{timings[name]:>10.0f}")
+
+    print(f"\n{top} slowest imports of `import search_logs`:")
+    print(f"{'MODULE':<42}{'CUMULATIVE (ms)':>16}")
+    for milliseconds, module in slowest_imports(top):
+        print(f"{module:<42}{milliseconds:>16.1f}")
+
+    failed = False
+    if eager := eager_imports():
+        print(f"\n##ERR## Imported at startup instead of when used: {', '.join(eager)}")
+        failed = True
+    if max_ms is not None and (slow := [name for name, milliseconds in timings.items() if milliseconds > max_ms]):
+        print(f"\n##ERR## Slower than {max_ms:.0f} ms: {', '.join(slow)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    app()
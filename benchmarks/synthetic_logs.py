@@ -0,0 +1,225 @@
+"""Seeded generator of synthetic IP Fabric logs, per family, for the parser benchmarks.
+
+The logs look like the ones downloaded from IP Fabric: a sequence of commands, each
+one starting with the prompt of the device, with some noise (bell chars, CRLF,
+ANSI cursor moves for the Aruba switches) and a size driven by the number of
+interfaces of the device. The same seed always gives the same log.
+"""
+
+import random
+
+# Number of interfaces of the device for each size of log
+SIZES = {"small": 48, "medium": 480, "large": 4800}
+
+FAMILIES = ["ios-xe", "nx-os", "junos", "ios-xr", "pan-os", "arubasw"]
+
+
+def generate_log(family: str, size: str = "small", seed: int = 0, index: int = 0) -> dict:
+    """Return a log record (`hostname`, `sn`, `family`, `version`, `text`) for the family.
+
+    Examples:
+    --------
+        >>> log = generate_log("ios-xe", "small", seed=1)
+        >>> log == generate_log("ios-xe", "small", seed=1), log["text"].startswith(log["hostname"])
+        (True, True)
+
+    """
+    rng = random.Random(f"{family}/{size}/{seed}/{index}")
+    hostname, version, sections = GENERATORS[family](rng, SIZES[size])
+    text = "".join(f"{prompt_of(hostname, family)}{command}\n{output}\n" for command, output in sections)
+    text += prompt_of(hostname, family)
+    if rng.random() < 0.5:
+        text = text.replace("\n", "\r\n")
+    return {
+        "hostname": f"{hostname}/vsys1" if family == "pan-os" else hostname,
+        "sn": f"SN{seed:04d}{index:06d}",
+        "family": family,
+        "version": version,
+        "text": text,
+    }
+
+
+def prompt_of(hostname: str, family: str) -> str:
+    if family == "ios-xr":
+        return f"RP/0/RSP0/CPU0:{hostname}#"
+    if family in ["junos", "pan-os"]:
+        return f"admin@{hostname}> "
+    return f"{hostname}#"
+
+
+def _noise(rng: random.Random, lines: int) -> str:
+    """Unrelated output (logging buffer), to pad the log like the real ones."""
+    return "\n".join(
+        f"*{rng.choice(['Jan', 'Feb', 'Mar'])} {rng.randint(1, 28)} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:"
+        f"{rng.randint(0, 59):02d}: %LINK-3-UPDOWN: Interface GigabitEthernet1/0/{rng.randint(1, 48)}, changed state to "
+        f"{rng.choice(['up', 'down'])}\x07"
+        for _ in range(lines)
+    )
+
+
+def _ios_xe(rng: random.Random, interfaces: int):
+    hostname = f"C9K-{rng.randint(100, 999)}"
+    running_config = ["version 17.9", f"hostname {hostname}", "enable secret 9 $9$abcdefgh$ijklmnop"]
+    running_config += [f"username user{n} privilege 15 secret 9 $9$u{n}$hash" for n in range(rng.randint(2, 6))]
+    for n in range(1, interfaces + 1):
+        running_config += [f"interface GigabitEthernet1/0/{n}", f" description access port {n}", " switchport mode access", "!"]
+    show_interfaces = [
+        f"GigabitEthernet1/0/{n} is {rng.choice(['up', 'down'])}, line protocol is up (connected)\n"
+        f"  Hardware is Gigabit Ethernet, address is 0011.2233.{n:04x}\n"
+        f"  MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec,\n"
+        f"     {rng.randint(0, 10**9)} packets input, {rng.randint(0, 10**12)} bytes, 0 no buffer"
+        for n in range(1, interfaces + 1)
+    ]
+    show_env = ["SYSTEM TEMPERATURE is OK"] + [
+        f"Temp: {sensor:<16}R0    Normal           {rng.randint(20, 60)} Celsius"
+        for sensor in ["Inlet", "Outlet", "Hotspot", "CPU Die", "HotSwap"]
+    ]
+    return hostname, "17.9.4", [
+        ("show version", f"Cisco IOS XE Software, Version 17.09.04\n{hostname} uptime is 4 weeks"),
+        ("show running-config", "\n".join(running_config)),
+        ("show interfaces", "\n".join(show_interfaces)),
+        ("show logging", _noise(rng, interfaces // 2)),
+        ("show env all", "\n".join(show_env)),
+    ]
+
+
+def _nx_os(rng: random.Random, interfaces: int):
+    hostname = f"N5K-{rng.randint(100, 999)}"
+    fexes = [101 + n for n in range(max(1, interfaces // 48))]
+    show_env = [
+        "Temperature:",
+        "-" * 76,
+        "Module   Sensor        MajorThresh   MinorThres   CurTemp     Status",
+        "                       (Celsius)     (Celsius)    (Celsius)",
+        "-" * 76,
+    ] + [
+        f"1        {sensor:<14}{80:<14}{70:<13}{rng.randint(25, 60):<12}Ok"
+        for sensor in ["FRONT", "BACK", "CPU", "ASIC"]
+    ] + ["", "Fan:", "Fan1(sys_fan1)  N5K-C5596-FAN  --  front-to-back  Ok"]
+    show_env_fex = []
+    for fex in fexes:
+        show_env_fex += [
+            f"Temperature Fex {fex}:",
+            "-" * 65,
+            "Module   Sensor     MajorThresh   MinorThres   CurTemp     Status",
+            "                    (Celsius)     (Celsius)    (Celsius)",
+            "-" * 65,
+        ] + [
+            f"1        {sensor:<11}{60:<14}{50:<13}{rng.randint(25, 55):<12}ok"
+            for sensor in ["DIE-1", "Outlet-1", "Inlet-1"]
+        ] + ["", f"Fan Fex: {fex}:", "Fan1(sys_fan1)  N2K-C2248-FAN  --  Ok", ""]
+    show_interface = []
+    for n in range(interfaces):
+        fex = fexes[n % len(fexes)]
+        show_interface.append(
+            f"Ethernet{fex}/1/{n // len(fexes) + 1} is {rng.choice(['up', 'down'])}\n"
+            # a line at column 0 inside the block, as in the real outputs
+            "admin state is up, Dedicated Interface\n"
+            f"  Hardware: 100/1000 Ethernet, address: 0022.bdf8.{n:04x}\n"
+            f"  MTU 1500 bytes, BW 1000000 Kbit, DLY 10 usec\n"
+            f"  RX\n    {rng.randint(0, 10**9)} unicast packets  0 multicast packets\n"
+            f"    {rng.choice([0, 0, 0, rng.randint(1, 999)])} Rx pause\n"
+            f"  TX\n    {rng.randint(0, 10**9)} unicast packets  0 multicast packets\n"
+            f"    {rng.choice([0, 0, 0, rng.randint(1, 999)])} Tx pause"
+        )
+    return hostname, "7.3(8)N1(1)", [
+        ("show version", f"Cisco Nexus Operating System (NX-OS) Software\n{hostname} uptime is 120 day(s)"),
+        ("show interface", "\n".join(show_interface)),
+        ("show logging", _noise(rng, interfaces // 2)),
+        ("show environment", "\n".join(show_env) + "\n"),
+        ("show environment fex all", "\n".join(show_env_fex)),
+    ]
+
+
+def _junos(rng: random.Random, interfaces: int):
+    hostname = f"MX-{rng.randint(100, 999)}"
+    show_env = ["Class Item                           Status     Measurement"]
+    for fpc in range(max(1, interfaces // 40)):
+        for position, sensor in enumerate(["Intake", "Exhaust A", "Exhaust B", "LU 0 TSen"]):
+            label = "Temp " if fpc == 0 and position == 0 else "     "
+            temperature = rng.randint(25, 70)
+            show_env.append(
+                f"{label} FPC {fpc} {sensor:<24}OK         {temperature} degrees C / {temperature * 9 // 5 + 32} degrees F"
+            )
+    show_interfaces = [
+        f"Physical interface: ge-0/0/{n}, Enabled, Physical link is {rng.choice(['Up', 'Down'])}\n"
+        f"  Link-level type: Ethernet, MTU: 1514, Speed: 1000mbps\n"
+        f"  Input rate     : {rng.randint(0, 10**6)} bps ({rng.randint(0, 1000)} pps)"
+        for n in range(interfaces)
+    ]
+    return hostname, "21.4R3", [
+        ("show version", f"Hostname: {hostname}\nModel: mx480\nJunos: 21.4R3-S2"),
+        ("show interfaces", "\n".join(show_interfaces)),
+        ("show chassis environment", "\n".join(show_env)),
+    ]
+
+
+def _ios_xr(rng: random.Random, interfaces: int):
+    hostname = f"ASR9K-{rng.randint(100, 999)}"
+    running_config = [f"hostname {hostname}"]
+    for n in range(rng.randint(2, 8)):
+        running_config += [f"username user{n}", " group root-lr", f" secret 10 $6$salt{n}$hash", "!"]
+    running_config += ["key chain OSPF-KEYS", " key 1", "  key-string password 0822455D0A16", "!"]
+    for n in range(2):
+        running_config += [f"tacacs-server host 10.0.0.{n} port 49", " key 7 05080F1C2243", "!"]
+    running_config += ["snmp-server user monitor GRP v3 auth sha encrypted 1234 priv aes 128 encrypted 5678"]
+    for n in range(interfaces):
+        running_config += [
+            f"interface GigabitEthernet0/0/0/{n}",
+            f" description core link {n}",
+            f" ipv4 address 10.{n // 256}.{n % 256}.1 255.255.255.252",
+            "!",
+        ]
+    return hostname, "7.5.2", [
+        ("show version", f"Cisco IOS XR Software, Version 7.5.2\n{hostname} uptime is 3 weeks"),
+        ("show logging", _noise(rng, interfaces // 2)),
+        ("show running-config", "\n".join(running_config)),
+    ]
+
+
+def _pan_os(rng: random.Random, interfaces: int):
+    hostname = f"PA-{rng.randint(100, 999)}"
+    config = ["config {", "  devices {", "    localhost.localdomain {", "      network {", "        interface {"]
+    for n in range(interfaces):
+        config += [f"          ethernet1/{n + 1} {{", "            layer3 {", f"              ip 10.1.{n % 256}.1/24;", "            }", "          }"]
+    config += ["        }", "      }", "      vsys {", "        vsys1 {"]
+    if rng.random() < 0.5:
+        config += ["          global-protect { global-protect-portal GP-PORTAL { portal-config { enable; } } }"]
+    config += ["          rulebase {", "            security {", "              rules {"]
+    for n in range(interfaces // 2):
+        config += [f"                rule-{n} {{", "                  action allow;", "                  log-end yes;", "                }"]
+    config += ["              }", "            }", "          }", "        }", "      }", "    }", "  }", "}"]
+    return hostname, rng.choice(["10.2.9", "11.0.2", "11.1.0"]), [
+        ("show system info", f"hostname: {hostname}\nsw-version: 11.0.2"),
+        ("show config merged", "\n".join(config)),
+    ]
+
+
+def _arubasw(rng: random.Random, interfaces: int):
+    hostname = f"HP-2930F-{rng.randint(100, 999)}"
+    show_interfaces = [
+        f"\x1b[{n % 24 + 1};1H\x1b[2K  {n + 1:<6} 0           0           0           0          0"
+        for n in range(interfaces)
+    ]
+    show_version = (
+        "\x1b[2K\x1b[?25hImage stamp:    /ws/swbuildm/rel_ukiah_qaoff/code/build/lvm(swbuildm_rel_ukiah_qaoff_rel_ukiah)\n"
+        "               Jul 20 2023 10:14:03\n"
+        "               WC.16.11.0012\n"
+        "               1335\n"
+        f"Boot Image:     Primary\n\nBoot ROM Version:    WC.17.02.00{rng.randint(0, 99):02d}\nActive Boot ROM:     Primary"
+    )
+    return hostname, "WC.16.11.0012", [
+        ("show interfaces brief", "\n".join(show_interfaces)),
+        ("show versi\x1b[24;13Hon", show_version),
+        ("show logging", _noise(rng, interfaces // 2)),
+    ]
+
+
+GENERATORS = {
+    "ios-xe": _ios_xe,
+    "nx-os": _nx_os,
+    "junos": _junos,
+    "ios-xr": _ios_xr,
+    "pan-os": _pan_os,
+    "arubasw": _arubasw,
+}
@@ -0,0 +1,158 @@
+"""Read the device logs and the inventory from a local snapshot archive (offline mode).
+
+Instead of one `get_text_log` API call per device, the logs are read from a
+tar / tar.gz / zip file stored locally, so the checks can run without any access
+to IP Fabric (air-gapped analysis boxes, re-runs of an old audit...).
+
+Expected content of the archive, at any depth:
+    devices.json (or inventory.json)   the inventory: JSON list of the devices, as
+                                       returned by `ipf_client.inventory.devices.all`
+    <sn>.log / <sn>.txt (.gz)          the text log of each device, named after its sn
+
+A zip or an uncompressed tar is read at random, in the order of the inventory. A
+compressed tar (.tar.gz, .tgz...) is not: going back in it decompresses it again
+from the start. The logs of the devices matched by the filter are then extracted in
+a single pass, in the order of the archive, to a temporary directory read instead.
+"""
+
+import contextlib
+import gzip
+import json
+import os
+import posixpath
+import re
+import tarfile
+import tempfile
+import threading
+import zipfile
+
+INVENTORY_FILES = ["devices.json", "inventory.json"]
+LOG_SUFFIXES = [".log", ".txt", ".log.gz", ".txt.gz"]
+
+
+class ArchiveLogs:
+    """Logs of a snapshot archive, with the same `get_text_log(host)` as `DeviceConfigs`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # size of each file of the archive, by name
+        # logs extracted from a compressed tar: the sns wanted, and the path of each file extracted
+        self._compressed = False
+        self._wanted = set()
+        self._extracted = {}
+        self._extract_dir = None
+        if zipfile.is_zipfile(path):
+            self._archive = zipfile.ZipFile(path)
+            self._sizes = {info.filename: info.file_size for info in self._archive.infolist() if not info.is_dir()}
+        else:
+            try:
+                self._archive = tarfile.open(path, "r:")
+            except tarfile.ReadError:
+                self._archive = tarfile.open(path)
+                self._compressed = True
+            self._sizes = {member.name: member.size for member in self._archive.getmembers() if member.isfile()}
+        self._inventory_file = None
+        self._log_files = {}
+        for name in self._sizes:
+            basename = posixpath.basename(name)
+            if basename in INVENTORY_FILES and self._inventory_file is None:
+                self._inventory_file = name
+            for suffix in LOG_SUFFIXES:
+                if basename.endswith(suffix):
+                    self._log_files.setdefault(basename[: -len(suffix)], name)
+                    break
+
+    def _read(self, name: str) -> bytes:
+        with self._lock:
+            if isinstance(self._archive, zipfile.ZipFile):
+                data = self._archive.read(name)
+            elif name in self._extracted:
+                with open(self._extracted[name], "rb") as file:
+                    data = file.read()
+            else:
+                data = self._archive.extractfile(name).read()
+        return gzip.decompress(data) if name.endswith(".gz") else data
+
+    def _extract_logs(self, sns):
+        """Extract the logs of the sns not extracted yet from the compressed tar, in one pass in its order."""
+        with self._lock:
+            self._wanted.update(sns)
+            names = {self._log_files[sn] for sn in self._wanted if sn in self._log_files} - self._extracted.keys()
+            if not names:
+                return
+            if self._extract_dir is None:
+                # removed with the object, or at exit
+                self._extract_dir = tempfile.TemporaryDirectory(prefix="ipf-archive-")
+            for member in self._archive:
+                if member.name in names:
+                    extracted_path = os.path.join(self._extract_dir.name, str(len(self._extracted)))
+                    with self._archive.extractfile(member) as source, open(extracted_path, "wb") as target:
+                        while chunk := source.read(1024 * 1024):
+                            target.write(chunk)
+                    self._extracted[member.name] = extracted_path
+
+    def devices(self, filters: dict = None) -> list:
+        """Return the inventory of the archive, filtered like the devices table of IP Fabric."""
+        if self._inventory_file is None:
+            raise FileNotFoundError(f"no {' / '.join(INVENTORY_FILES)} in the archive {self.path}")
+        devices = json.loads(self._read(self._inventory_file))
+        devices = [device for device in devices if match_filter(device, filters or {})]
+        if self._compressed:
+            self._extract_logs(device.get("sn") for device in devices)
+        return devices
+
+    def get_text_log(self, host: dict):
+        """Return the log of the device, or None if it's not in the archive."""
+        if (name := self._log_files.get(host["sn"])) is None:
+            return None
+        if self._compressed and name not in self._extracted:
+            self._extract_logs([host["sn"]])
+        return self._read(name).decode("utf-8", errors="replace")
+
+    def log_size(self, sn: str):
+        """Return the size of the log of the device in the archive, without reading it, or None."""
+        return self._sizes.get(self._log_files.get(sn))
+
+    def close(self):
+        with contextlib.suppress(Exception):
+            self._archive.close()
+        if self._extract_dir is not None:
+            self._extract_dir.cleanup()
+
+
+def match_filter(device: dict, filters: dict) -> bool:
+    """Apply an IP Fabric table filter to a device of the inventory.
+
+    Supports `and` / `or` and the operators eq, neq, like, notlike, reg, nreg,
+    which covers the usual `DEVICES_FILTER`.
+
+    Examples:
+    --------
+        >>> match_filter({"hostname": "L35AC12", "family": "ios-xe"}, {"or": [{"family": ["eq", "ios"]}, {"hostname": ["like", "AC12"]}]})
+        True
+
+    """
+    for column, condition in filters.items():
+        if column == "and":
+            if not all(match_filter(device, sub_filter) for sub_filter in condition):
+                return False
+        elif column == "or":
+            if not any(match_filter(device, sub_filter) for sub_filter in condition):
+                return False
+        else:
+            operator, value = condition
+            field = "" if device.get(column) is None else str(device.get(column))
+            if operator == "eq":
+                matched = field == str(value)
+            elif operator == "neq":
+                matched = field != str(value)
+            elif operator in ["like", "notlike"]:
+                matched = (str(value).lower() in field.lower()) == (operator == "like")
+            elif operator in ["reg", "nreg"]:
+                matched = bool(re.search(str(value), field)) == (operator == "reg")
+            else:
+                raise ValueError(f"filter operator `{operator}` is not supported in offline mode")
+            if not matched:
+                return False
+    return True
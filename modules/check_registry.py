@@ -0,0 +1,112 @@
+"""Table-driven checks, and evaluation of several checks in a single pass over the logs.
+
+Each check declares what it extracts from the log of each family in a rules table,
+`{family: rule}`, instead of an `if/elif` on the family. A rule is either the parser
+of the family, called with the log and the prompt delimiter, for the outputs which
+need some code, or a declaration of the extraction:
+
+    {
+        "command": "show version",           # command whose output is searched
+        "fields": {"value": r"BIOS Version\\s*:\\s*(?P<value>\\S+)"},  # group named as the field
+        "row": {"family": "arubacx", "detail": "BIOS Version"},       # fixed fields of the row
+        "device_field": "device",            # field holding the hostname ("hostname" by default)
+        "strip_domain": True,                # hostname of the prompt/row without its domain
+        "fallback_to_log": True,             # search the whole log if the command is not found
+        "not_found": "not found",            # value of a field whose pattern has no match
+    }
+
+A declared rule gives a single row per device. Its patterns are compiled once, when
+the table is built with `compile_rules`.
+
+With several checks selected, `iter_single_pass` visits each log once for all the
+checks parsing nothing but the log: the log is sent once to the worker processes,
+its command sections are indexed once and shared by the checks, and only the
+outputs are kept afterwards, not the logs.
+
+The checks are referred to by the path of their functions, `"module:function"`, and
+their modules are only imported when one of them is run (`load_function`).
+"""
+
+import importlib
+
+from modules.concurrency import TIMED_OUT, map_logs
+from modules.log_index import find_command_section
+from modules.patterns import compile_pattern
+
+
+def load_function(path: str):
+    """Return the function of a `"module:function"` path, importing its module if it's not yet.
+
+    Examples:
+    --------
+        >>> load_function("modules.normalisation:normalise_text").__name__
+        'normalise_text'
+
+    """
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def compile_rules(rules: dict) -> dict:
+    """Return the rules table with the patterns of the declared rules compiled."""
+    compiled = {}
+    for family, rule in rules.items():
+        if isinstance(rule, dict):
+            rule = dict(rule, fields={field: compile_pattern(pattern) for field, pattern in rule["fields"].items()})
+        compiled[family] = rule
+    return compiled
+
+
+def apply_rules(rules: dict, log, prompt_delimiter: str, default=None):
+    """Return the output of the rule of the family of the log, `default` if the family has no rule."""
+    if (rule := rules.get(log["family"])) is None:
+        return default
+    if callable(rule):
+        return rule(log, prompt_delimiter)
+    return extract_row(rule, log, prompt_delimiter)
+
+
+def extract_row(rule: dict, log, prompt_delimiter: str) -> list:
+    """Return the row declared by `rule` for the log, [] if its command is not found (and no fallback)."""
+    hostname = log["hostname"].split(".")[0] if rule.get("strip_domain") else log["hostname"]
+    text = find_command_section(log, prompt_delimiter, rule["command"], hostname=hostname)
+    if text is None:
+        if not rule.get("fallback_to_log"):
+            return []
+        text = log["text"]
+    row = {rule.get("device_field", "hostname"): hostname, **rule.get("row", {})}
+    for field, pattern in rule["fields"].items():
+        match = pattern.search(text)
+        row[field] = match[field].strip() if match else rule.get("not_found")
+    return [row]
+
+
+def evaluate_checks(log, parsers: list) -> tuple:
+    """Run the parser of each check on the log, `parsers` being a list of (check, function, arguments after the log).
+
+    Returns (sn, {check: output}).
+    """
+    return log["sn"], {name: func(log, *args) for name, func, args in parsers}
+
+
+def iter_single_pass(log_list, parsers: dict, devices: dict, workers: int = 1):
+    """Yield (sn, {check: output}) for each log, all the checks being evaluated in the same visit of the log.
+
+    `parsers` is `{check: (function, arguments after the log)}`, the per-log function
+    of each check, and `devices` the serial numbers each check runs on. A log whose
+    parsing goes over the time budget gets `TIMED_OUT` as the output of its checks.
+    """
+
+    def checks_of(log) -> list:
+        return [name for name in parsers if log["sn"] in devices[name]]
+
+    def timeout_outputs(log):
+        return log["sn"], {name: TIMED_OUT for name in checks_of(log)}
+
+    def jobs():
+        for log in log_list:
+            # the logs downloaded for the other checks only are skipped
+            if names := checks_of(log):
+                yield log, [(name, *parsers[name]) for name in names]
+
+    yield from map_logs(evaluate_checks, jobs(), workers, on_timeout=timeout_outputs)
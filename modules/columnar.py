@@ -0,0 +1,102 @@
+"""Typed columnar export (Parquet) of the tabular checks: temperature, OS details, pause counters.
+
+The rows are written in row groups while the devices are parsed, with numeric
+columns stored as numbers (`curTemp`, `rxPause`, `txPause`), so the analytics jobs
+load them directly. It needs `pyarrow` (`pip install pyarrow`), which is only
+imported when a Parquet file is written.
+"""
+
+# Columns of each export, with their type: "string", "int64" or "float64"
+TEMPERATURE_COLUMNS = {
+    "device": "string",
+    "module": "string",
+    "sensor": "string",
+    "location": "string",
+    "curTemp": "float64",
+    "status": "string",
+}
+OS_DETAILS_COLUMNS = {
+    "device": "string",
+    "family": "string",
+    "detail": "string",
+    "value": "string",
+}
+PAUSE_COLUMNS = {
+    "device": "string",
+    "interface": "string",
+    "rxPause": "int64",
+    "txPause": "int64",
+    "status": "string",
+}
+
+ROW_GROUP_SIZE = 10000
+
+
+def to_number(value, column_type: str):
+    """Convert a parsed value to the type of its column, None if it's not a number ("not found"...).
+
+    Examples:
+    --------
+        >>> to_number("42", "int64"), to_number("38.5", "float64"), to_number("not found", "float64")
+        (42, 38.5, None)
+
+    """
+    try:
+        return int(value) if column_type == "int64" else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetRowWriter:
+    """Write dict rows to a Parquet file, one row group every `row_group_size` rows."""
+
+    def __init__(self, path: str, columns: dict, row_group_size: int = ROW_GROUP_SIZE):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = path
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([(name, getattr(pa, column_type)()) for name, column_type in columns.items()])
+        self._writer = pq.ParquetWriter(path, self.schema)
+        self._buffer = []
+        self.rows = 0
+
+    def write(self, row: dict):
+        typed_row = {}
+        for name, column_type in self.columns.items():
+            value = row.get(name)
+            if column_type == "string":
+                typed_row[name] = None if value is None else str(value)
+            else:
+                typed_row[name] = to_number(value, column_type)
+        self._buffer.append(typed_row)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(self._pa.Table.from_pylist(self._buffer, schema=self.schema))
+            self.rows += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def export_parquet(rows, path: str, columns: dict, row_group_size: int = ROW_GROUP_SIZE):
+    """Yield the rows, writing them to the Parquet file on the way.
+
+    Only the dict rows are written, the ones telling a device had no match
+    (`{hostname: "No matches found"}`) are passed through without being exported.
+    """
+    writer = ParquetRowWriter(path, columns, row_group_size)
+    try:
+        for row in rows:
+            if isinstance(row, dict) and not set(row).isdisjoint(columns):
+                writer.write(row)
+            yield row
+    finally:
+        writer.close()
@@ -0,0 +1,198 @@
+"""Helpers to run blocking work (API calls, parsing) concurrently, while keeping
+the results in the same order as the input.
+"""
+
+import contextlib
+import functools
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+# Key of a log record holding an output already known: the one of a previous run (see
+# `modules.incremental`), or the one of the single pass over the logs of all the checks
+# (see `modules.check_registry`). `map_logs` returns it instead of parsing the log
+REUSED_OUTPUT = "_reused_output"
+
+# Output of a log whose parsing was stopped by the time budget, see `time_budget`
+TIMED_OUT = "_timed_out"
+TIMEOUT = "TIMEOUT"
+
+# Callbacks called with (log, output) for each log handled by `map_logs`, see `record_outputs`
+_recorders = []
+# Callbacks called with (log, seconds) for each log parsed by `map_logs`, see `time_logs`
+_timers = []
+# Time budget (s) of the parsing of each log by `map_logs`, see `time_budget`
+_budgets = []
+
+
+def ordered_map(func, iterable, workers: int = 1, executor_class=ThreadPoolExecutor, inline=None):
+    """Yield `func(item)` for each item of `iterable`, in the input order.
+
+    With `workers` <= 1 everything runs serially in the calling thread. Otherwise
+    the items are submitted to a pool of `workers`, with at most `2 * workers`
+    items in flight: the input is consumed lazily, so a generator can be passed
+    without being fully materialised. The items for which `inline(item)` is true
+    are not worth sending to the pool, they are run in the calling thread.
+    """
+    if workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    with executor_class(max_workers=workers) as executor:
+        pending = deque()
+        for item in iterable:
+            if inline is not None and inline(item):
+                future = Future()
+                future.set_result(func(item))
+            else:
+                future = executor.submit(func, item)
+            pending.append(future)
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def map_logs(func, jobs, workers: int = 1, on_timeout=None, initializer=None, initargs: tuple = ()):
+    """Yield `func(*job)` for each job, in order, parsing the logs on `workers` processes.
+
+    Each job is the tuple of arguments of `func`, usually the log and what the parser
+    needs for this device (family, interfaces...). `func` must be a module-level
+    function so it can be sent to the worker processes. With `workers` <= 1 the logs
+    are parsed serially, in the calling process.
+
+    What is the same for all the logs is better not sent with each job: it's handed
+    once to `initializer(*initargs)`, called in each worker process (or in the calling
+    process when serial) before the first job, e.g. to set a module-level global.
+
+    Within a `time_budget` block, the parsing of a log taking longer than the budget
+    is stopped, and `on_timeout(log)` is yielded in place of its output: by default
+    `{hostname: "TIMEOUT"}`, the callers yielding several rows per log pass their own.
+    """
+    recorders = list(_recorders)
+    timers = list(_timers)
+    budget = _budgets[-1] if _budgets else None
+    if on_timeout is None:
+        on_timeout = _timeout_output
+    # logs whose output has not been yielded yet, at most the ones in flight
+    logs = deque()
+
+    def track(jobs):
+        for job in jobs:
+            logs.append(job[0])
+            yield job
+
+    # imported here: multiprocessing is not loaded by the runs which parse nothing (--help...)
+    from concurrent.futures import ProcessPoolExecutor
+
+    executor_class = ProcessPoolExecutor
+    if initializer is not None:
+        if workers <= 1:
+            initializer(*initargs)
+        else:
+            executor_class = functools.partial(ProcessPoolExecutor, initializer=initializer, initargs=initargs)
+    # the parse time is measured where the log is parsed, i.e. in the worker process
+    call = functools.partial(_call_timed if timers else _call, func, budget)
+    # the output of a reused log is already known, it's not sent to a worker process
+    outputs = ordered_map(call, track(jobs), workers, executor_class, inline=_is_reused)
+    for output in outputs:
+        log = logs.popleft()
+        if timers:
+            output, seconds = output
+            if REUSED_OUTPUT not in log:
+                for timer in timers:
+                    timer(log, seconds)
+        if output == TIMED_OUT:
+            # not recorded: the next incremental run parses the device again
+            if REUSED_OUTPUT not in log:
+                print(f"##WARNING## {log['hostname']}: parsing stopped after {budget}s, reported as {TIMEOUT}")
+            yield on_timeout(log)
+            continue
+        for recorder in recorders:
+            recorder(log, output)
+        yield output
+
+
+@contextlib.contextmanager
+def record_outputs(callback):
+    """Call `callback(log, output)` for each log handled by `map_logs` within the block."""
+    _recorders.append(callback)
+    try:
+        yield
+    finally:
+        _recorders.remove(callback)
+
+
+@contextlib.contextmanager
+def time_logs(callback):
+    """Call `callback(log, seconds)` with the parse time of each log parsed by `map_logs` within the block."""
+    _timers.append(callback)
+    try:
+        yield
+    finally:
+        _timers.remove(callback)
+
+
+@contextlib.contextmanager
+def time_budget(seconds: float):
+    """Stop the parsing of a log by `map_logs` after `seconds` within the block (None or 0: no budget).
+
+    The budget relies on SIGALRM: it's not enforced on Windows, nor when the logs
+    are parsed serially outside of the main thread.
+    """
+    _budgets.append(seconds or None)
+    try:
+        yield
+    finally:
+        _budgets.pop()
+
+
+class BudgetExceeded(BaseException):
+    """Raised in the parser by SIGALRM, a BaseException so `except Exception` in a parser doesn't swallow it."""
+
+
+def _is_reused(job) -> bool:
+    return REUSED_OUTPUT in job[0]
+
+
+def _timeout_output(log) -> dict:
+    return {log["hostname"]: TIMEOUT}
+
+
+def _call_timed(func, budget, job):
+    start = time.perf_counter()
+    output = _call(func, budget, job)
+    return output, time.perf_counter() - start
+
+
+def _call(func, budget, job):
+    if REUSED_OUTPUT in job[0]:
+        return job[0][REUSED_OUTPUT]
+    if not budget or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        return func(*job)
+    return _call_with_budget(func, budget, job)
+
+
+def _call_with_budget(func, budget, job):
+    def stop(signum, frame):
+        raise BudgetExceeded
+
+    # the `re` module checks the signals while matching, a pathological regex is stopped too
+    previous = signal.signal(signal.SIGALRM, stop)
+    try:
+        try:
+            signal.setitimer(signal.ITIMER_REAL, budget)
+            return func(*job)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except BudgetExceeded:
+        # also when the alarm goes off between the end of the parsing and the disarm
+        return TIMED_OUT
+    finally:
+        signal.signal(signal.SIGALRM, previous)
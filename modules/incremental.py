@@ -0,0 +1,167 @@
+"""Incremental runs: reuse the results of the devices unchanged since the previous run.
+
+When auditing the nightly snapshot, most devices are the same as the night before.
+The output of each check for each device is kept in a state file, with a fingerprint
+of what the output depends on: the inventory fields of the device, the hash of its
+configuration as of the audited snapshot, and the size of its log when known without
+downloading it (archive). On the next run, the devices with the same fingerprint are
+not downloaded nor parsed, their previous output is handed back by `map_logs` in
+place of the parsing.
+
+The fingerprint only follows the configuration: the checks of the operational state
+(temperature, counters...) include the snapshot in their settings, and only reuse the
+outputs of a previous run of the same snapshot.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+from modules.concurrency import REUSED_OUTPUT
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+INVENTORY_FIELDS = ["hostname", "family", "vendor", "platform", "model", "version"]
+
+
+def _digest(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def snapshot_key(ipf_client=None, archive: str = None) -> str:
+    """Return what identifies the snapshot audited: its id, or the path, size and mtime of the archive."""
+    if ipf_client is not None:
+        return ipf_client.snapshot_id
+    archive_stat = os.stat(archive)
+    return f"{os.path.abspath(archive)}:{archive_stat.st_size}:{archive_stat.st_mtime_ns}"
+
+
+def get_config_hashes(ipf_client) -> dict:
+    """Return the hash of the configuration of each device as of the snapshot, by sn.
+
+    The configuration table is not bound to a snapshot: the changes made after the end
+    of the snapshot are filtered out, and the most recent of the others is kept. None
+    is returned if the table or the time of the snapshot can't be read.
+    """
+    try:
+        snapshot_end = ipf_client.snapshots[ipf_client.snapshot_id].end
+        configs = ipf_client.fetch_all(
+            "tables/management/configuration",
+            columns=["sn", "hash", "lastChangeAt"],
+            filters={"lastChangeAt": ["lte", int(snapshot_end.timestamp() * 1000)]},
+            sort={"order": "desc", "column": "lastChangeAt"},
+            snapshot=False,
+        )
+    except Exception as exc:
+        # without the hashes, no check reuses the outputs of another snapshot
+        print(f"##WARNING## Unable to get the configuration hashes, only the results of this snapshot are reused: {exc}")
+        return None
+    config_hashes = {}
+    for config in configs:
+        config_hashes.setdefault(config["sn"], config["hash"])
+    return config_hashes
+
+
+def device_fingerprints(ipf_devices, config_hashes: dict = None, log_sizes: dict = None) -> dict:
+    """Return the fingerprint of each device, by sn.
+
+    Examples:
+    --------
+        >>> fingerprints = device_fingerprints([{"sn": "A1", "hostname": "R1", "family": "ios"}], {"A1": "f00d"})
+        >>> fingerprints == device_fingerprints([{"sn": "A1", "hostname": "R1", "family": "ios"}], {"A1": "f00d"})
+        True
+
+    """
+    config_hashes = config_hashes or {}
+    log_sizes = log_sizes or {}
+    return {
+        device["sn"]: _digest(
+            [
+                [device.get(field) for field in INVENTORY_FIELDS],
+                config_hashes.get(device["sn"]),
+                log_sizes.get(device["sn"]),
+            ]
+        )
+        for device in ipf_devices
+    }
+
+
+def check_settings(*settings) -> str:
+    """Digest of what the output of a check depends on, besides the device (rules, delimiter...)."""
+    return _digest(settings)
+
+
+class IncrementalState:
+    """Outputs of the previous run, per check and per device, stored in a JSON file.
+
+    The file holds `{"snapshot_id": ..., "checks": {check: {"settings": ..., "devices":
+    {sn: {"fingerprint": ..., "output": ...}}}}}`. A check run with other settings
+    (e.g. a modified `INPUT_DATA`, or another snapshot for the checks bound to it)
+    doesn't reuse anything.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.snapshot_id = None
+        self.checks = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                state = json.load(file)
+            self.snapshot_id = state.get("snapshot_id")
+            self.checks = state.get("checks", {})
+        self._new_checks = {}
+
+    def reusable_outputs(self, check: str, settings: str, fingerprints: dict) -> dict:
+        """Return the previous outputs of the devices of `fingerprints` unchanged since the last run, by sn."""
+        previous = self.checks.get(check)
+        if not previous or previous.get("settings") != settings:
+            return {}
+        return {
+            sn: entry["output"]
+            for sn, fingerprint in fingerprints.items()
+            if (entry := previous["devices"].get(sn)) is not None and entry["fingerprint"] == fingerprint
+        }
+
+    def recorder(self, check: str, settings: str, fingerprints: dict):
+        """Return the `record_outputs` callback storing the outputs of this run for the check."""
+        devices = {}
+        self._new_checks[check] = {"settings": settings, "devices": devices}
+
+        def record(log, output):
+            devices[log["sn"]] = {"fingerprint": fingerprints[log["sn"]], "output": output}
+
+        return record
+
+    def save(self, snapshot_id: str = None):
+        """Write the state file, with the outputs of the checks run this time (the others are kept)."""
+        checks = {**self.checks, **self._new_checks}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(file_descriptor, "w") as file:
+            json.dump({"snapshot_id": snapshot_id, "checks": checks}, file)
+        os.replace(tmp_path, self.path)
+
+
+def merge_reused(log_list, devices: list, reused_outputs: dict):
+    """Yield the logs of `log_list`, and a record holding the previous output for each reused device.
+
+    `log_list` has the logs of the devices to parse, in the order of `devices`: the
+    records are yielded in this order, so the results keep the order of the devices.
+    """
+    logs = iter(log_list)
+    next_log = next(logs, None)
+    for device in devices:
+        if device["sn"] in reused_outputs:
+            yield {
+                "hostname": device["hostname"],
+                "sn": device["sn"],
+                "family": device["family"],
+                "version": device.get("version"),
+                REUSED_OUTPUT: reused_outputs[device["sn"]],
+            }
+        elif next_log is not None and next_log["sn"] == device["sn"]:
+            yield next_log
+            next_log = next(logs, None)
@@ -0,0 +1,101 @@
+"""Split the per-interface outputs (`show interface`, `show ip interface`) in one
+block per interface.
+
+The output is scanned once and turned into an `{interface_name: block}` map, so
+finding the block of an interface is a dict hit instead of a regex over the whole
+output. A block is the header line of the interface and the indented lines
+following it, like the `(^{interface}.*$[\\n\\r]*(?:^\\s.*$[\\n\\r]*)*)` sections used
+so far. The NX-OS outputs have lines at column 0 inside the blocks ("admin state is
+up, Dedicated Interface"), a block of these families runs up to the next header.
+"""
+
+import re
+
+from modules.patterns import compile_pattern
+
+# Interface name at the start of a header line: GigabitEthernet0/0/1, Ethernet101/1/1,
+# Port-channel10, Vlan10, mgmt0, Tunnel0.100...
+INTERFACE_NAME = r"(?P<name>[A-Za-z][\w\-./:]*\d[\w./:]*)"
+
+# Header line of an interface block, per family
+#   IOS / IOS-XE / EOS: "GigabitEthernet0/0 is up, line protocol is up"
+#                       "Ethernet1 is administratively down, line protocol is down (disabled)"
+#   IOS-XR:             "GigabitEthernet0/0/0/0 is Up, ipv4 protocol is Up"
+#   NX-OS:              "Ethernet1/1 is up" (show interface)
+#                       "Vlan10, Interface status: protocol-up/link-up/admin-up, iod: 5," (show ip interface)
+IOS_HEADER = rf"^{INTERFACE_NAME} is (?P<status>(?:administratively )?\w+)"
+IOSXR_HEADER = rf"(?i:^{INTERFACE_NAME} is (?P<status>(?:administratively )?\w+))"
+NXOS_HEADER = rf"^{INTERFACE_NAME}(?: is (?P<status>\w+)|, Interface status: (?P<ip_status>\S+?),)"
+
+INTERFACE_HEADERS = {
+    "ios": IOS_HEADER,
+    "ios-xe": IOS_HEADER,
+    "eos": IOS_HEADER,
+    "ios-xr": IOSXR_HEADER,
+    "nx-os": NXOS_HEADER,
+    "aci": NXOS_HEADER,
+}
+# Used for the families without a specific format, it covers both header formats
+DEFAULT_HEADER = NXOS_HEADER
+
+# Rest of the header line, then the indented lines of the block
+BLOCK_BODY = r".*$[\n\r]*(?:^\s.*$[\n\r]*)*"
+
+# Families whose blocks are not delimited by the indentation, but by the next header
+HEADER_TO_HEADER_FAMILIES = {"nx-os", "aci"}
+
+
+def split_interface_blocks(command_output: str, family: str = None, to_next_header: bool = None) -> dict:
+    """Return the `{interface_name: block}` map of a per-interface command output.
+
+    The output is scanned once. If an interface appears more than once, its first
+    block is kept. With `to_next_header`, a block runs from its header to the next
+    one, instead of stopping at the first line which is not indented; by default it
+    does for the families of `HEADER_TO_HEADER_FAMILIES`.
+
+    Examples:
+    --------
+        >>> blocks = split_interface_blocks("Gi1 is up, line protocol is up\\n  MTU 1500\\nGi2 is down\\n", "ios")
+        >>> blocks["Gi1"]
+        'Gi1 is up, line protocol is up\\n  MTU 1500\\n'
+        >>> split_interface_blocks("Ethernet1/1 is up\\nadmin state is up\\n  5 Rx pause\\nEthernet1/2 is down\\n", "nx-os")
+        {'Ethernet1/1': 'Ethernet1/1 is up\\nadmin state is up\\n  5 Rx pause\\n', 'Ethernet1/2': 'Ethernet1/2 is down\\n'}
+
+    """
+    if to_next_header is None:
+        to_next_header = family in HEADER_TO_HEADER_FAMILIES
+    blocks = {}
+    if to_next_header:
+        headers = list(compile_pattern(INTERFACE_HEADERS.get(family, DEFAULT_HEADER), re.MULTILINE).finditer(command_output))
+        ends = [header.start() for header in headers[1:]] + [len(command_output)]
+        for header, end in zip(headers, ends):
+            blocks.setdefault(header["name"], command_output[header.start():end])
+        return blocks
+    for block in interface_block_regex(family).finditer(command_output):
+        blocks.setdefault(block["name"], block[0])
+    return blocks
+
+
+def is_interface_name(name: str) -> bool:
+    """Return True if `name` could be the name of an interface, i.e. a key of `split_interface_blocks`.
+
+    Examples:
+    --------
+        >>> is_interface_name("GigabitEthernet1/0/1"), is_interface_name("router bgp 65000"), is_interface_name("Loopback")
+        (True, False, False)
+
+    """
+    return isinstance(name, str) and compile_pattern(INTERFACE_NAME).fullmatch(name) is not None
+
+
+def interface_block_regex(family: str = None) -> re.Pattern:
+    """Return the compiled regex matching one interface block, for the family."""
+    header = INTERFACE_HEADERS.get(family, DEFAULT_HEADER)
+    return compile_pattern(header + BLOCK_BODY, re.MULTILINE)
+
+
+def interface_status(block: str, family: str = None):
+    """Return the status of the interface from the header of its block (up, down...), or None."""
+    if header := compile_pattern(INTERFACE_HEADERS.get(family, DEFAULT_HEADER), re.MULTILINE).match(block):
+        return header.groupdict().get("status") or header.groupdict().get("ip_status")
+    return None
@@ -0,0 +1,70 @@
+"""Inventory of the devices of the snapshot, indexed once for all the checks.
+
+The checks used to look the family / version of each log up with a linear scan
+of `ipf_devices`, i.e. O(devices²) per run. The `Inventory` is built once from
+`ipf_client.inventory.devices.all`, and answers these lookups with a dict hit.
+It can be used wherever the list of devices was used: it has a length and
+iterates over the device dicts.
+"""
+
+from collections import defaultdict
+
+
+class Inventory:
+    """Devices of the snapshot, indexed by sn, hostname and family.
+
+    Examples:
+    --------
+        >>> inventory = Inventory([{"sn": "A1", "hostname": "R1", "family": "ios-xe", "version": "17.3"}])
+        >>> inventory.family("A1"), inventory.version("A1"), len(inventory)
+        ('ios-xe', '17.3', 1)
+
+    """
+
+    def __init__(self, devices: list):
+        self.devices = list(devices)
+        self.by_sn = {}
+        self.by_hostname = {}
+        self.by_family = defaultdict(list)
+        for device in self.devices:
+            self.by_sn[device["sn"]] = device
+            self.by_hostname.setdefault(device["hostname"], device)
+            self.by_family[device["family"]].append(device)
+
+    @classmethod
+    def from_client(cls, ipf_client, filters: dict = None):
+        """Build the inventory from IP Fabric, with the same filter as the devices table."""
+        return cls(ipf_client.inventory.devices.all(filters=filters or {}))
+
+    @classmethod
+    def of(cls, devices):
+        """Return `devices` if it's already an `Inventory`, otherwise index the list of devices."""
+        return devices if isinstance(devices, cls) else cls(devices)
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def get(self, sn: str):
+        return self.by_sn.get(sn)
+
+    def family(self, sn: str):
+        return self.by_sn[sn]["family"]
+
+    def version(self, sn: str):
+        return self.by_sn[sn].get("version")
+
+    def with_families(self, families) -> list:
+        """Return the devices of the given families, in the inventory order."""
+        families = set(families)
+        return [device for device in self.devices if device["family"] in families]
+
+    def annotate(self, log: dict) -> dict:
+        """Carry the family and version of the device onto the log record, and return it."""
+        if "family" not in log or "version" not in log:
+            device = self.by_sn[log["sn"]]
+            log["family"] = device["family"]
+            log["version"] = device.get("version")
+        return log
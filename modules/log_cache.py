@@ -0,0 +1,166 @@
+"""Persistent on-disk cache of the IP Fabric device logs.
+
+A snapshot never changes once it has been taken, so the log of a device can be
+reused by every run made against the same snapshot. The logs are stored gzipped,
+one file per device, under `<cache_dir>/<snapshot_id>/<sn>.log.gz`.
+The total size of the cache is capped: the least recently used files are removed
+first, whatever the snapshot they belong to, down to `LOW_WATER` of the cap so the
+next logs stored don't trigger an eviction each.
+
+A long-running process (`--serve`) keeps the logs in memory as well, in a
+`MemoryLogCache` in front of the files, so the logs are neither downloaded nor
+read back from the disk by the following requests. It holds the normalised text,
+so they are not cleaned again either.
+"""
+
+import contextlib
+import gzip
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from modules.normalisation import normalise_text
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "ipf-search-log"
+DEFAULT_MAX_SIZE_MB = 2048
+DEFAULT_MEMORY_MB = 1024
+# Share of the size cap the cache is brought back to by an eviction
+LOW_WATER = 0.9
+
+
+class LogCache:
+    """Cache of the device logs, keyed by (snapshot id, device sn)."""
+
+    def __init__(self, cache_dir, snapshot_id: str, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.snapshot_dir = self.cache_dir / _safe_name(snapshot_id)
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # size of each cached file, the least recently used first: read from the disk
+        # once, then kept up to date by `get` and `set`
+        files = []
+        for path in self.cache_dir.glob("*/*.log.gz"):
+            with contextlib.suppress(OSError):
+                stat = path.stat()
+                files.append((stat.st_mtime, path, stat.st_size))
+        self._files = OrderedDict((path, size) for _, path, size in sorted(files))
+        self._size = sum(self._files.values())
+
+    def _path(self, sn: str) -> Path:
+        return self.snapshot_dir / f"{_safe_name(sn)}.log.gz"
+
+    def get(self, sn: str):
+        """Return the cached log of the device, or None if it's not in the cache."""
+        path = self._path(sn)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+                text = file.read()
+        except (OSError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+        # refresh the modification time, the order of the next runs relies on it
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        with self._lock:
+            self.hits += 1
+            if path in self._files:
+                self._files.move_to_end(path)
+        return text
+
+    def set(self, sn: str, text: str):
+        """Store the log of the device, then evict old entries if the cache is too big."""
+        path = self._path(sn)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8", newline="") as file:
+            file.write(text)
+        size = tmp_path.stat().st_size
+        with self._lock:
+            os.replace(tmp_path, path)
+            self._size += size - self._files.pop(path, 0)
+            self._files[path] = size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Remove the least recently used files until the cache is down to `LOW_WATER` of its size cap."""
+        while self._files and self._size > self.max_size * LOW_WATER:
+            path, size = self._files.popitem(last=False)
+            self._size -= size
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+class MemoryLogCache:
+    """In-memory cache of the normalised device logs, in front of an optional `LogCache`.
+
+    The texts held are the normalised ones (`normalise_text`), handed back as they
+    are: the raw text given to `set` only goes to the `LogCache`, the normalised one
+    is added by `keep` once the log is cleaned. The size of the texts held is capped,
+    the least recently used ones are dropped first (they stay in the `LogCache` on
+    the disk, if any).
+    """
+
+    # the texts returned by `get` are already normalised
+    normalised = True
+
+    def __init__(self, max_size_mb: int = DEFAULT_MEMORY_MB, backing: LogCache = None):
+        self.max_size = max_size_mb * 1024 * 1024
+        self.backing = backing
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._texts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._texts)
+
+    @property
+    def size(self) -> int:
+        """Number of characters held in memory."""
+        return self._size
+
+    def get(self, sn: str):
+        """Return the normalised log of the device, from the memory or the backing cache, None if it's in neither."""
+        with self._lock:
+            if (text := self._texts.get(sn)) is not None:
+                self._texts.move_to_end(sn)
+                self.hits += 1
+                return text
+            self.misses += 1
+        if self.backing is not None and (text := self.backing.get(sn)) is not None:
+            text = normalise_text(text)
+            self.keep(sn, text)
+        return text
+
+    def set(self, sn: str, text: str):
+        """Store the raw log of the device in the backing cache, see `keep` for the memory."""
+        if self.backing is not None:
+            self.backing.set(sn, text)
+
+    def keep(self, sn: str, text: str):
+        """Hold the normalised log of the device in memory."""
+        with self._lock:
+            if (old_text := self._texts.pop(sn, None)) is not None:
+                self._size -= len(old_text)
+            self._texts[sn] = text
+            self._size += len(text)
+            while self._size > self.max_size and len(self._texts) > 1:
+                _, dropped = self._texts.popitem(last=False)
+                self._size -= len(dropped)
+
+    def clear(self):
+        with self._lock:
+            self._texts.clear()
+            self._size = 0
+
+
+def _safe_name(value: str) -> str:
+    """Make a snapshot id / serial number usable as a file name."""
+    return re.sub(r"[^\w.-]", "_", str(value))
@@ -0,0 +1,139 @@
+"""Index of the command sections of an IP Fabric log.
+
+A log is the concatenation of the commands run on the device, each one starting
+with the prompt (`hostname#show version`) and ending with the next prompt.
+Instead of running a `{hostname}{prompt_delimiter}.{command}.*[\\s\\S]*?(?=...)`
+regex over the whole log for every command we look for, the log is scanned once
+to find all the prompts, and each command echo is mapped to the span of its output.
+
+The text can also be bytes (the `mmap` of a `SpooledLog`): the scan then runs bytes
+regexes over it, and only the sections returned are decoded.
+
+The command looked for is a regex matched at the start of the echo, as it was in the
+regex above: a plain command (no regex metacharacter) is looked up in the index
+instead, as an identical echo or a prefix of the echo.
+"""
+
+from modules.log_store import SpooledLog
+from modules.patterns import compile_pattern
+
+# Characters making a command a regex, instead of a plain command
+REGEX_METACHARACTERS = frozenset("\\.^$*+?{}[]|()")
+
+
+def _prompt_regex(prompt_delimiter: str, binary: bool = False):
+    """Regex matching the end of a prompt, right after the hostname: `(config)#`, `>`...
+
+    The delimiter is wrapped in a non-capturing group so a multi-option delimiter
+    (e.g. "#|>") doesn't break the surrounding pattern's precedence.
+    """
+    pattern = rf"\S*?(?:{prompt_delimiter})"
+    return compile_pattern(pattern.encode("utf-8") if binary else pattern)
+
+
+class LogIndex:
+    """Command sections of a log, found with a single scan of the text.
+
+    Each section goes from the prompt (starting at the hostname) to the next prompt,
+    like the regex used so far: the last command of the log, not followed by a
+    prompt, has no section.
+
+    Examples:
+    --------
+        >>> index = LogIndex("R1#show clock\\n10:00\\nR1#show version\\nIOS 17\\nR1#", "R1", "#")
+        >>> index.section("show version")
+        'R1#show version\\nIOS 17\\n'
+        >>> index.section("show ip route") is None
+        True
+        >>> index.section("sh(ow)? ver")
+        'R1#show version\\nIOS 17\\n'
+
+    """
+
+    def __init__(self, text, hostname: str, prompt_delimiter: str, spans: list = None):
+        self.text = text
+        self.spans = spans if spans is not None else self._scan(text, hostname, prompt_delimiter)
+        # first section for each command echo, for the O(1) lookups
+        self._by_command = {}
+        for position, (command, _, _) in enumerate(self.spans):
+            self._by_command.setdefault(command, position)
+
+    @staticmethod
+    def _scan(text, hostname: str, prompt_delimiter: str) -> list:
+        """Return the list of (command echo, start, end) of all the sections of the log."""
+        binary = not isinstance(text, str)
+        prompt_regex = _prompt_regex(prompt_delimiter, binary)
+        if binary and hostname:
+            hostname = hostname.encode("utf-8")
+        newline, bell = (b"\n", b"\x07") if binary else ("\n", "\x07")
+        prompts = []
+        position = text.find(hostname) if hostname else -1
+        while position != -1:
+            if prompt := prompt_regex.match(text, position + len(hostname)):
+                end_of_line = text.find(newline, prompt.end())
+                if end_of_line == -1:
+                    end_of_line = len(text)
+                command = text[prompt.end() : end_of_line].replace(bell, b"" if binary else "").strip()
+                if binary:
+                    command = command.decode("utf-8", errors="replace")
+                prompts.append((command, position))
+                position = text.find(hostname, end_of_line)
+            else:
+                position = text.find(hostname, position + 1)
+        return [
+            (command, start, next_start)
+            for (command, start), (_, next_start) in zip(prompts, prompts[1:])
+        ]
+
+    def commands(self) -> list:
+        """Return the command echoes of the log, in order."""
+        return [command for command, _, _ in self.spans]
+
+    def section(self, command: str):
+        """Return the first section of `command`, from its prompt to the next prompt, or None.
+
+        An echo identical to `command` is preferred, otherwise the first echo starting
+        with `command` is used (`show ip interface` matches `show ip interface brief`).
+        A command with regex metacharacters is the regex matched at the start of the echo.
+        """
+        if not REGEX_METACHARACTERS.isdisjoint(command):
+            command_regex = compile_pattern(command)
+            position = next(
+                (position for position, (echo, _, _) in enumerate(self.spans) if command_regex.match(echo)),
+                None,
+            )
+        elif (position := self._by_command.get(command)) is None:
+            position = next(
+                (position for position, (echo, _, _) in enumerate(self.spans) if echo.startswith(command)),
+                None,
+            )
+        if position is None:
+            return None
+        _, start, end = self.spans[position]
+        section = self.text[start:end]
+        return section if isinstance(section, str) else section.decode("utf-8", errors="replace")
+
+
+def get_log_index(log: dict, prompt_delimiter: str, hostname: str = None) -> LogIndex:
+    """Return the `LogIndex` of the log, built once and kept with the log record.
+
+    Only the spans of the sections are kept in the record (not the text), so a
+    `CompressedLog` stays compressed. A `SpooledLog` is indexed through its `mmap`.
+    """
+    hostname = hostname or log["hostname"]
+    text = log.buffer() if isinstance(log, SpooledLog) else log["text"]
+    indexes = log.get("_index")
+    if indexes is None:
+        indexes = {}
+        log["_index"] = indexes
+    key = (hostname, prompt_delimiter)
+    if key in indexes:
+        return LogIndex(text, hostname, prompt_delimiter, spans=indexes[key])
+    index = LogIndex(text, hostname, prompt_delimiter)
+    indexes[key] = index.spans
+    return index
+
+
+def find_command_section(log: dict, prompt_delimiter: str, command: str, hostname: str = None):
+    """Return the output of `command` in the log (prompt and echo included), or None."""
+    return get_log_index(log, prompt_delimiter, hostname).section(command)
@@ -0,0 +1,186 @@
+"""Log records kept in memory in a compact form.
+
+The network CLI logs compress 10-20x, so when all the logs of a run have to stay
+in memory, the `"text"` of each record can be held compressed, and only
+decompressed when a parser reads it.
+
+The very large logs (hundreds of MB for some chassis) can instead be spooled to a
+temporary file: the sections are then found in a memory map of the file, and only
+the sections read by the parsers are decoded to `str`.
+"""
+
+import contextlib
+import mmap
+import os
+import tempfile
+import weakref
+import zlib
+from collections.abc import ItemsView, ValuesView
+
+
+class _TextRecord(dict):
+    """Log record whose `"text"` is stored in another form, and read back by `_text(stored)`.
+
+    All the accessors return the text: `log["text"]`, `get`, `items`, `values`, and the
+    copies (`dict(log)`, `{**log}`), which go through `keys` / `__getitem__` instead
+    of copying the stored value because `__iter__` is overridden.
+    """
+
+    def _text(self, stored) -> str:
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        return self._text(value) if key == "text" else value
+
+    def __iter__(self):
+        return super().__iter__()
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return ItemsView(self)
+
+    def values(self):
+        return ValuesView(self)
+
+
+class CompressedLog(_TextRecord):
+    """Log record (`hostname`, `sn`, `text`...) whose `"text"` is stored zlib-compressed.
+
+    It behaves like the plain dict records: `log["text"]` returns the decompressed
+    text, so the parsers don't need to know about it.
+
+    Examples:
+    --------
+        >>> log = CompressedLog(hostname="R1", sn="ABC123", text="R1#show version\\n...")
+        >>> log["text"], dict(log)["text"]
+        ('R1#show version\\n...', 'R1#show version\\n...')
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        if key == "text" and isinstance(value, str):
+            value = zlib.compress(value.encode("utf-8"))
+        super().__setitem__(key, value)
+
+    def _text(self, stored) -> str:
+        return zlib.decompress(stored).decode("utf-8")
+
+    def __reduce__(self):
+        # sent to a worker process compressed, `__setitem__` keeps the bytes as they are
+        return CompressedLog, (), None, None, iter(dict.items(self))
+
+    def compressed_size(self) -> int:
+        """Size in bytes of the compressed text."""
+        return len(dict.get(self, "text", b""))
+
+
+class SpooledLog(_TextRecord):
+    """Log record whose `"text"` is spooled to a temporary file, and read through an `mmap`.
+
+    `log.buffer()` returns the memory map of the encoded text, which `get_log_index`
+    scans with bytes regexes, so the whole text is never held in the Python heap.
+    `log["text"]` still returns the full decoded text, for the parsers needing it: it
+    is decoded once and shared while it's in use, then released.
+    The memory map is closed and the file removed once the record is garbage
+    collected, or its text replaced. A copy sent to a worker process maps the same
+    file, without owning it.
+
+    Examples:
+    --------
+        >>> log = SpooledLog(hostname="R1", sn="ABC123", text="R1#show version\\n...")
+        >>> log.buffer()[:15], log["text"]
+        (b'R1#show version', 'R1#show version\\n...')
+
+    """
+
+    def __init__(self, *args, spool_dir: str = None, **kwargs):
+        super().__init__()
+        self._spool_dir = spool_dir
+        self._path = None
+        self._mmap = None
+        # memory maps of the file, closed by the finalizer
+        self._mmaps = []
+        self._finalizer = None
+        # the decoded text, kept while something else holds it
+        self._decoded = None
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        if key == "text" and isinstance(value, str):
+            # the file of the previous text is not needed any more
+            self._release()
+            file_descriptor, self._path = tempfile.mkstemp(prefix="ipf-log-", suffix=".log", dir=self._spool_dir)
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(value.encode("utf-8"))
+            self._finalizer = weakref.finalize(self, _release_spool, self._path, self._mmaps)
+            value = self._path
+        super().__setitem__(key, value)
+
+    def _text(self, stored) -> str:
+        if (text := self._decoded and self._decoded()) is None:
+            text = _SpooledText(bytes(self.buffer()).decode("utf-8", errors="replace"))
+            self._decoded = weakref.ref(text)
+        return text
+
+    def _release(self):
+        """Close the memory map and remove the file of the current text, if the record owns it."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._path = None
+        self._mmap = None
+        self._mmaps = []
+        self._finalizer = None
+        self._decoded = None
+
+    def buffer(self) -> mmap.mmap:
+        """Return the read-only memory map of the UTF-8 text."""
+        if self._mmap is None:
+            with open(self._path, "rb") as file:
+                # an empty file can't be mapped
+                if os.path.getsize(self._path):
+                    self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._mmaps.append(self._mmap)
+                else:
+                    self._mmap = b""
+        return self._mmap
+
+    def __reduce__(self):
+        fields = {key: value for key, value in dict.items(self) if key != "text"}
+        return _attach_spooled_log, (self._path, fields)
+
+
+class _SpooledText(str):
+    """Decoded text of a `SpooledLog`, a `str` which can be weakly referenced."""
+
+
+def _attach_spooled_log(path: str, fields: dict) -> SpooledLog:
+    """Rebuild a `SpooledLog` on an existing spool file (in a worker process), without owning it."""
+    log = SpooledLog(fields)
+    log._path = path
+    # only the memory map is closed, the file belongs to the parent process
+    log._finalizer = weakref.finalize(log, _release_spool, None, log._mmaps)
+    dict.__setitem__(log, "text", path)
+    return log
+
+
+def _release_spool(path: str, mmaps: list):
+    for memory_map in mmaps:
+        # not closed while a view of it is still exported, it's then closed when collected
+        with contextlib.suppress(BufferError):
+            memory_map.close()
+    if path is not None:
+        _remove(path)
+
+
+def _remove(path: str):
+    with contextlib.suppress(OSError):
+        os.remove(path)
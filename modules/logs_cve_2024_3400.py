@@ -1,7 +1,15 @@
 import contextlib
 import re
+from typing import TYPE_CHECKING
 
-from ipfabric import IPFClient
+from modules.check_registry import apply_rules
+from modules.concurrency import map_logs
+from modules.inventory import Inventory
+from modules.log_index import find_command_section
+from modules.patterns import compile_pattern
+
+if TYPE_CHECKING:
+    from ipfabric import IPFClient
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -24,28 +32,36 @@ def display_cve_2024_3400(result: list):
     print(new_result)
 
 
-def get_device_family(ipf_devices, sn):
-    return [device["family"] for device in ipf_devices if device["sn"] == sn][0]
-
-
-def get_os_version(ipf_devices, sn):
-    return [device["version"] for device in ipf_devices if device["sn"] == sn][0]
+def iter_cve_2024_3400(
+    ipf_client: "IPFClient",
+    ipf_devices: list,
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+):
+    """Yield the CVE-2024-3400 exposure of each PAN-OS device, as soon as its log is parsed."""
+    inventory = Inventory.of(ipf_devices)
+    jobs = ((inventory.annotate(log), prompt_delimiter) for log in log_list)
+    for log_result in map_logs(cve_2024_3400, jobs, workers):
+        if log_result is not None:
+            yield log_result
 
 
 def search_cve_2024_3400(
-    ipf_client: IPFClient,
+    ipf_client: "IPFClient",
     ipf_devices: list,
     log_list,
     prompt_delimiter: str,
     verbose: bool = False,
+    workers: int = 1,
 ):
-    result = []
-    for log in log_list:
-        family = get_device_family(ipf_devices, log["sn"])
-        version = get_os_version(ipf_devices, log["sn"])
-        if family in ["pan-os"]:
-            result.append(pan_os_config_cve_2024_3400(log, prompt_delimiter, version))
-    return result
+    return list(iter_cve_2024_3400(ipf_client, ipf_devices, log_list, prompt_delimiter, verbose, workers))
+
+
+def cve_2024_3400(log, prompt_delimiter: str):
+    """Parse a single log with the function of its family, None if the family is not supported"""
+    return apply_rules(CVE_2024_3400_RULES, log, prompt_delimiter)
 
 
 def pan_os_config_cve_2024_3400(log, prompt_delimiter, version):
@@ -78,12 +94,11 @@ def pan_os_config_cve_2024_3400(log, prompt_delimiter, version):
     }
     # we search and extract the output for the show ip interface command
     hostname_altered = log["hostname"].split("/")[0] if "/" in log["hostname"] else log["hostname"]
-    command_pattern = rf'(.*{hostname_altered}{prompt_delimiter}.*{input_string["command"]}.*[\s\S]*?(?=.*{hostname_altered}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-
-    if command_section := command_regex.search(log["text"]):
-        pattern = re.compile(input_string["match"], re.MULTILINE)
-        matches = pattern.findall(command_section[0])
+    if command_section := find_command_section(
+        log, prompt_delimiter, input_string["command"], hostname=hostname_altered
+    ):
+        pattern = compile_pattern(input_string["match"], re.MULTILINE)
+        matches = pattern.findall(command_section)
     else:
         return {log["hostname"]: ""}
 
@@ -103,3 +118,8 @@ def pan_os_config_cve_2024_3400(log, prompt_delimiter, version):
         else:
             output.append(match.strip())
     return {log["hostname"]: output}
+
+
+CVE_2024_3400_RULES = {
+    "pan-os": lambda log, prompt_delimiter: pan_os_config_cve_2024_3400(log, prompt_delimiter, log["version"]),
+}
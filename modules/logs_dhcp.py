@@ -3,9 +3,16 @@
 """
 
 import contextlib
-import re
+from typing import TYPE_CHECKING
 
-from ipfabric import IPFClient
+from modules.concurrency import TIMEOUT, map_logs
+from modules.interface_blocks import split_interface_blocks
+from modules.log_index import find_command_section
+from modules.patterns import find_indented_block
+from modules.profiling import phase
+
+if TYPE_CHECKING:
+    from ipfabric import IPFClient
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -26,7 +33,37 @@ def display_dhcp_interfaces(result: list):
     print(result_nok)
 
 
-def search_dhcp_interfaces(ipf_client: IPFClient, log_list, prompt_delimiter: str, verbose: bool = False):
+def get_interfaces_with_ip(ipf_client: "IPFClient", sn_list, chunk_size: int = 200):
+    """Return the relevant interfaces -> assigned with an IP Address, grouped by device sn
+
+    The interfaces of all the devices are fetched with a few bulk queries (one per
+    `chunk_size` devices), instead of one query per device.
+    """
+    sn_list = list(dict.fromkeys(sn_list))
+    interfaces_by_sn = {sn: [] for sn in sn_list}
+    with phase("api: interfaces"):
+        for index in range(0, len(sn_list), chunk_size):
+            filter_interfaces_with_ip = {
+                "and": [
+                    {"primaryIp": ["empty", False]},
+                    {"or": [{"sn": ["eq", sn]} for sn in sn_list[index : index + chunk_size]]},
+                ]
+            }
+            for interface in ipf_client.inventory.interfaces.all(
+                columns=["sn", "nameOriginal"], filters=filter_interfaces_with_ip
+            ):
+                interfaces_by_sn.setdefault(interface["sn"], []).append(interface)
+    return interfaces_by_sn
+
+
+def search_dhcp_interfaces(
+    ipf_client: "IPFClient",
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+    sn_list: list = None,
+):
     """A function to search if an Interface with an IP has been allocated via DHCP or not
 
     Attributes
@@ -35,45 +72,72 @@ def search_dhcp_interfaces(ipf_client: IPFClient, log_list, prompt_delimiter: st
         the list of strings to search for
     log_list: list of objects
         object items containing hostnames, log files, ..
+    workers: int
+        number of processes parsing the logs, 1 keeps it serial
+    sn_list: list of strings
+        serial numbers of the devices of log_list, to fetch their interfaces upfront
+        while log_list is streamed. If not provided, log_list is loaded in memory.
 
     """
+    return list(iter_dhcp_interfaces(ipf_client, log_list, prompt_delimiter, verbose, workers, sn_list))
+
+
+def iter_dhcp_interfaces(
+    ipf_client: "IPFClient",
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+    sn_list: list = None,
+):
+    """Generator version of `search_dhcp_interfaces`, yielding the interfaces of each device once parsed."""
+    if sn_list is None:
+        log_list = list(log_list)
+        sn_list = [log["sn"] for log in log_list]
+    interfaces_by_sn = get_interfaces_with_ip(ipf_client, sn_list)
 
-    def get_device_interfaces(ipf_client: IPFClient, sn: str):
-        """Return the list of relevant interfaces -> assigned with an IP Address"""
-        filter_interfaces_with_ip = {"and": [{"primaryIp": ["empty", False]}, {"sn": ["eq", sn]}]}
-        return ipf_client.inventory.interfaces.all(filters=filter_interfaces_with_ip)
+    jobs = ((log, interfaces_by_sn.get(log["sn"], []), prompt_delimiter, verbose) for log in log_list)
 
+    def timeout_rows(log):
+        return [{"hostname": log["hostname"], "found": TIMEOUT}]
+
+    for log_result in map_logs(dhcp_interfaces, jobs, workers, on_timeout=timeout_rows):
+        yield from log_result
+
+
+def dhcp_interfaces(log, interfaces: list, prompt_delimiter: str, verbose: bool = False):
+    """Check, in a single log, if each of the interfaces gets its IP address via DHCP or not"""
     result = []
     input_string = {
         "command": "show ip interface",
         "match": "Address determined by DHCP",
     }
-    for log in log_list:
-        # we search and extract the output for the show ip interface command
-        command_pattern = rf'(^{log["hostname"]}{prompt_delimiter}.{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-        command_regex = re.compile(command_pattern, re.MULTILINE)
-        if command_section := command_regex.search(log["text"]):
-            # we search and extract the section for each interface
-            for interface in get_device_interfaces(ipf_client, log["sn"]):
-                # create a deepcopy to edit the item without affecting input_strings
-                # item = copy.deepcopy(input_string)
-                item = {}
-                item["hostname"] = log["hostname"]
-                item["interface"] = interface["nameOriginal"]
-                pattern = rf'(^{item["interface"]}.*$[\n\r]*(?:^\s.*$[\n\r]*)*)'
-                section_regex = re.compile(pattern, re.MULTILINE)
-                if section := section_regex.search(command_section[0]):
-                    present_in_log = "DHCP" if input_string["match"] in section[0] else "NOT DHCP"
-                    if verbose:
-                        item["matched_section"] = section[0]
-                else:
-                    present_in_log = f"Interface `{item['interface']}` not found"
-                item["found"] = present_in_log
-                result.append(item)
-
-        else:
-            present_in_log = "`show ip interface` not found`"
+    # we search and extract the output for the show ip interface command
+    if command_section := find_command_section(log, prompt_delimiter, input_string["command"]):
+        # we split the output in one section per interface, in a single pass
+        interface_blocks = split_interface_blocks(command_section, log.get("family"))
+        for interface in interfaces:
+            # create a deepcopy to edit the item without affecting input_strings
+            # item = copy.deepcopy(input_string)
+            item = {}
             item["hostname"] = log["hostname"]
+            item["interface"] = interface["nameOriginal"]
+            # an interface header not recognised for the family falls back to a prefix search
+            if section := interface_blocks.get(item["interface"]) or find_indented_block(
+                command_section, item["interface"]
+            ):
+                present_in_log = "DHCP" if input_string["match"] in section else "NOT DHCP"
+                if verbose:
+                    item["matched_section"] = section
+            else:
+                present_in_log = f"Interface `{item['interface']}` not found"
             item["found"] = present_in_log
             result.append(item)
+
+    else:
+        present_in_log = "`show ip interface` not found`"
+        item = {}
+        item["hostname"] = log["hostname"]
+        item["found"] = present_in_log
+        result.append(item)
     return result
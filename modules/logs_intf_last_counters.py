@@ -1,7 +1,12 @@
 import contextlib
-import re
+import json
 
-import pandas as pd
+from modules.check_registry import apply_rules
+from modules.concurrency import TIMEOUT, map_logs
+from modules.interface_blocks import interface_status, split_interface_blocks
+from modules.inventory import Inventory
+from modules.log_index import find_command_section
+from modules.patterns import compile_pattern
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -24,39 +29,56 @@ def display_interfaces_last_counters(result: list):
     print(new_result)
 
 
-def get_device_family(ipf_devices, sn):
-    return [device["family"] for device in ipf_devices if device["sn"] == sn][0]
-
-
 def save_to_csv(result, title: str):
     # use pandas to save the result to a csv file
+    import pandas as pd
+
     df = pd.DataFrame(result)
     df.to_csv(f"{title}.csv", index=False)
 
+def iter_interfaces_last_counters(
+    ipf_devices: list,
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+):
+    """Yield the interface counters, device by device, as the logs are parsed."""
+    inventory = Inventory.of(ipf_devices)
+    jobs = ((inventory.annotate(log), prompt_delimiter) for log in log_list)
+
+    def timeout_rows(log):
+        return [{"device": log["hostname"], "status": TIMEOUT}]
+
+    for log_result in map_logs(interfaces_last_counters, jobs, workers, on_timeout=timeout_rows):
+        yield from log_result
+
+
 def find_interfaces_last_counters(
     ipf_devices: list,
     log_list,
     prompt_delimiter: str,
     verbose: bool = False,
+    workers: int = 1,
 ):
-    result = []
-    for log in log_list:
-        family = get_device_family(ipf_devices, log["sn"])
-        if family in ["nx-os"]:
-            result.extend(nx_os_interfaces_pause_txrx(log, prompt_delimiter))
+    result = list(iter_interfaces_last_counters(ipf_devices, log_list, prompt_delimiter, verbose, workers))
     try:
         save_to_csv(result, "FEX-TxRxPause")
     except Exception as e:
         print(f"Error saving to CSV: {e}")
         # save as a json file
         with open("FEX-TxRxPause.json", "w") as f:
-            json_result = str(result).replace("'", '"')
-            f.write(json_result)
+            json.dump(result, f)
         print("Saved as JSON file: FEX-TxRxPause.json")
     
     return result
 
 
+def interfaces_last_counters(log, prompt_delimiter: str):
+    """Parse a single log with the function of its family, [] if the family is not supported"""
+    return apply_rules(LAST_COUNTERS_RULES, log, prompt_delimiter, default=[])
+
+
 def nx_os_interfaces_pause_txrx(log, prompt_delimiter):
     """Searches for specific patterns in a log text and extracts relevant information.
 
@@ -82,40 +104,39 @@ def nx_os_interfaces_pause_txrx(log, prompt_delimiter):
     """
     input_string = {
         "command": "show interface",
-        "match": r"(?P<interface>\w+(\d{3}/\d/\d+))\sis\s(?P<status>\w+)\s*.*?(?P<rx_pause>\d+)\sRx\spause.*?(?P<tx_pause>\d+)\sTx\spause",
-        # the regex will only match FEX interfaces Ethernet123/1/1, it won't capture Ethernet1/1/1 or other interfaces
+        # only the FEX interfaces Ethernet123/1/1 are checked, not Ethernet1/1/1 or other interfaces
+        "interface": r"\w+\d{3}/\d/\d+",
+        "rx_pause": r"(?P<rx_pause>\d+)\sRx\spause",
+        "tx_pause": r"(?P<tx_pause>\d+)\sTx\spause",
     }
-    full_logs = log["text"].replace("\x07", "")
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'({log["hostname"]}{prompt_delimiter}\s*{input_string["command"]}.*?[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-    if not (command_section := command_regex.search(full_logs)):
+    if not (command_section := find_command_section(log, prompt_delimiter, input_string["command"])):
         return {log["hostname"]: "No matches found"}
-    command_section = command_section[0].replace("\r\n", "\n")
-
-    pattern = re.compile(input_string["match"], re.DOTALL)
-    # result = []
-    # for match in pattern.finditer(command_section):
-    #     print(match)
-    #     result.append(
-    #         {
-    #             "device": log["hostname"],
-    #             "interface": match.group("interface").strip(),
-    #             "rxPause": match.group("rx_pause").strip(),
-    #             "txPause": match.group("tx_pause").strip(),
-    #             "status": match.group("status").strip(),
-    #         }
-    #     )
-    # return result
-
-    return [
-        {
-            "device": log["hostname"],
-            "interface": match.group("interface").strip(),
-            "rxPause": match.group("rx_pause").strip(),
-            "txPause": match.group("tx_pause").strip(),
-            "status": match.group("status").strip(),
-        }
-        for match in pattern.finditer(command_section)
-        if match.group("tx_pause").strip() != "0" or match.group("rx_pause").strip() != "0"
-    ]
+
+    interface_regex = compile_pattern(input_string["interface"])
+    rx_pause_regex = compile_pattern(input_string["rx_pause"])
+    tx_pause_regex = compile_pattern(input_string["tx_pause"])
+    result = []
+    # the counters are searched within the block of each interface, so they can't be
+    # taken from the next interface when an interface has no pause counters
+    for interface, block in split_interface_blocks(command_section, "nx-os").items():
+        if not interface_regex.fullmatch(interface):
+            continue
+        if not (rx_pause := rx_pause_regex.search(block)) or not (tx_pause := tx_pause_regex.search(block)):
+            continue
+        if rx_pause["rx_pause"] != "0" or tx_pause["tx_pause"] != "0":
+            result.append(
+                {
+                    "device": log["hostname"],
+                    "interface": interface,
+                    "rxPause": rx_pause["rx_pause"],
+                    "txPause": tx_pause["tx_pause"],
+                    "status": interface_status(block, "nx-os"),
+                }
+            )
+    return result
+
+
+LAST_COUNTERS_RULES = {
+    "nx-os": nx_os_interfaces_pause_txrx,
+}
@@ -3,11 +3,19 @@
 """
 
 import contextlib
-import copy
 import re
 
 from tqdm import tqdm
 
+from modules.concurrency import TIMEOUT, map_logs, ordered_map
+from modules.interface_blocks import is_interface_name, split_interface_blocks
+from modules.log_index import REGEX_METACHARACTERS, find_command_section
+from modules.log_store import CompressedLog, SpooledLog
+from modules.multi_match import MultiMatcher
+from modules.normalisation import normalise_text
+from modules.patterns import compile_pattern, lint_pattern
+from modules.profiling import phase
+
 with contextlib.suppress(ImportError):
     from rich import print
 
@@ -27,30 +35,87 @@ def display_log_compliance(result: list):
     print(result_nok)
 
 
-def download_logs(logs, ipf_devices: list, supported_families: list):
-    """Function to download the IP Fabric log of provided list of devices"""
-    return_list = []
+def download_logs(
+    logs,
+    ipf_devices: list,
+    supported_families: list,
+    workers: int = 1,
+    cache=None,
+    compress: bool = False,
+    spool_min_mb: int = None,
+):
+    """Function to download the IP Fabric log of provided list of devices
+
+    `workers` is the number of logs downloaded at the same time, 1 keeps it serial.
+    The order of the returned list follows the order of `ipf_devices`.
+    If a `LogCache` is provided, the logs are read from it first, and the downloaded
+    ones are added to it.
+    The text of each log is normalised once (`normalise_text`): no bell chars, no
+    carriage returns, no ANSI/CSI sequences.
+    With `compress`, the text of each log is held compressed in memory (`CompressedLog`).
+    With `spool_min_mb`, the logs of this size or more are spooled to a temporary file
+    (`SpooledLog`), and parsed through a memory map of it.
+    """
+    return list(iter_logs(logs, ipf_devices, supported_families, workers, cache, compress, spool_min_mb))
+
+
+def iter_logs(
+    logs,
+    ipf_devices: list,
+    supported_families: list,
+    workers: int = 1,
+    cache=None,
+    compress: bool = False,
+    spool_min_mb: int = None,
+):
+    """Generator version of `download_logs`, yielding each log as soon as it's downloaded.
+
+    The logs are never all held in memory: a parser looping over this generator
+    handles one log at a time, which is released once the parser moves to the next one.
+    A cache holding the normalised texts (`MemoryLogCache`) gets them with `keep`,
+    and its hits are not normalised again.
+    """
+    normalised_cache = getattr(cache, "normalised", False)
+
+    def get_log(host):
+        if cache is not None and (dev_log := cache.get(host["sn"])) is not None:
+            return host, dev_log, normalised_cache
+        dev_log = logs.get_text_log(host)
+        if cache is not None and dev_log:
+            cache.set(host["sn"], dev_log)
+        return host, dev_log, False
+
     progress_bar = tqdm(total=len(ipf_devices), desc="Downloading logs")
-    for host in ipf_devices:
+    supported_devices = [host for host in ipf_devices if host["family"] in supported_families]
+    # devices from other families are not downloaded, count them as done straight away
+    progress_bar.update(len(ipf_devices) - len(supported_devices))
+    for host, dev_log, normalised in ordered_map(get_log, supported_devices, workers):
         progress_bar.update(1)
-        if host["family"] not in supported_families:
-            # print(f"#DEBUG# device: {host['hostname']} is wrong family: {host['family']}")
-            continue
         # Get the log file
-        if dev_log := logs.get_text_log(host):
-            return_list.append(
-                {
-                    "hostname": host["hostname"],
-                    "sn": host["sn"],
-                    "text": dev_log,
-                },
-            )
+        if dev_log:
+            log = {
+                "hostname": host["hostname"],
+                "sn": host["sn"],
+                "family": host["family"],
+                "version": host.get("version"),
+                "size": len(dev_log),
+            }
+            with phase("normalisation"):
+                # cleaned once here, the checks read the normalised text
+                log["text"] = dev_log if normalised else normalise_text(dev_log)
+                if normalised_cache and not normalised:
+                    cache.keep(host["sn"], log["text"])
+                if spool_min_mb is not None and len(dev_log) >= spool_min_mb * 1024 * 1024:
+                    log = SpooledLog(log)
+                elif compress:
+                    log = CompressedLog(log)
+            yield log
         # else:
         #     print(f"#DEBUG# device: {host['hostname']} has no log")
-    return return_list
+    progress_bar.close()
 
 
-def search_logs(input_strings, log_list, prompt_delimiter: str, verbose: bool = False):
+def search_logs(input_strings, log_list, prompt_delimiter: str, verbose: bool = False, workers: int = 1):
     # sourcery skip: low-code-quality
     """A function to search for a specific list of string within the list of log files.
 
@@ -60,39 +125,132 @@ def search_logs(input_strings, log_list, prompt_delimiter: str, verbose: bool =
         the list of strings to search for
     log_list: list of objects
         object items containing hostnames, log files, ..
+    workers: int
+        number of processes parsing the logs, 1 keeps it serial
 
     """
+    return list(iter_search_results(input_strings, log_list, prompt_delimiter, verbose, workers))
+
+
+def iter_search_results(input_strings, log_list, prompt_delimiter: str, verbose: bool = False, workers: int = 1):
+    """Generator version of `search_logs`, yielding the result of each input string, log by log."""
+    # the rules are grouped once for the whole run, not per log, and handed once to
+    # each worker process: the jobs only carry the log
+    search = (input_strings, prompt_delimiter, verbose, group_rules(input_strings))
+    jobs = ((log,) for log in log_list)
+
+    def timeout_rows(log):
+        return [dict(input_string, hostname=log["hostname"], found=TIMEOUT) for input_string in input_strings]
+
+    for log_result in map_logs(
+        _search_prepared_log, jobs, workers, on_timeout=timeout_rows, initializer=_prepare_search, initargs=search
+    ):
+        yield from log_result
+
+
+# Rules of the search run by `_search_prepared_log`, set by `_prepare_search` in each process
+_prepared_search = None
+
+
+def _prepare_search(input_strings, prompt_delimiter: str, verbose: bool, rule_groups: list):
+    global _prepared_search
+    _prepared_search = (input_strings, prompt_delimiter, verbose, rule_groups)
+
+
+def _search_prepared_log(log):
+    return search_log(log, *_prepared_search)
+
+
+def lint_rules(input_strings) -> list:
+    """Return the (rule, problem) of the rules whose `section` is a regex prone to catastrophic backtracking.
+
+    The `section` which is not exactly an interface name is searched as the regex
+    `^{section}.*$`, on each line of the command output: it's linted as such. A
+    `section` or a `command` (see `LogIndex.section`) which is not a valid regex
+    raises `re.error`.
+    """
+    problems = []
+    for input_string in input_strings:
+        if not REGEX_METACHARACTERS.isdisjoint(command := input_string.get("command", "")):
+            try:
+                compile_pattern(command)
+            except re.error as exc:
+                raise re.error(f"invalid `command` {command!r}: {exc}") from exc
+        if section := input_string.get("section"):
+            try:
+                problems += [(input_string, problem) for problem in lint_pattern(rf"^{section}.*$", re.MULTILINE)]
+            except re.error as exc:
+                raise re.error(f"invalid `section` {section!r}: {exc}") from exc
+    return problems
+
+
+def group_rules(input_strings) -> list:
+    """Group the rules looking into the same (command, section), the rules without command are left out.
+
+    Returns a list of (command, has_section, section, rule indexes, matcher), where the
+    matcher finds all the `match` strings of the group with a single scan of the section.
+    """
+    groups = {}
+    for index, input_string in enumerate(input_strings):
+        if "command" in input_string.keys():
+            key = (input_string["command"], "section" in input_string.keys(), input_string.get("section"))
+            groups.setdefault(key, []).append(index)
+    return [
+        (command, has_section, section, indexes, MultiMatcher([input_strings[index]["match"] for index in indexes]))
+        for (command, has_section, section), indexes in groups.items()
+    ]
+
+
+def search_log(log, input_strings, prompt_delimiter: str, verbose: bool = False, rule_groups: list = None):
+    """Search the list of strings in a single log, return one item per input string."""
+    if rule_groups is None:
+        rule_groups = group_rules(input_strings)
+    # result of each rule: (found, matched section), evaluated once per group of rules
+    rule_results = {}
+    # interface blocks of the outputs, split once per command (see split_interface_blocks)
+    interface_blocks = {}
+    for command, has_section, section_name, indexes, matcher in rule_groups:
+        # we extract the output for the specified command
+        if not (command_section := find_command_section(log, prompt_delimiter, command)):
+            rule_results.update({index: ("COMMAND NOT FOUND", None) for index in indexes})
+            continue
+        if has_section:
+            # we extract the section within the output of the command, a section
+            # being exactly an interface name is a dict hit in the interface blocks,
+            # the output being only split for these sections
+            section = None
+            if is_interface_name(section_name):
+                if command not in interface_blocks:
+                    # delimited by the indentation, like the sections of the other rules
+                    interface_blocks[command] = split_interface_blocks(
+                        command_section, log.get("family"), to_next_header=False
+                    )
+                section = interface_blocks[command].get(section_name)
+            if not section:
+                pattern = rf'(^{section_name}.*$[\n\r]*(?:^\s.*$[\n\r]*)*)'
+                section_regex = compile_pattern(pattern, re.MULTILINE)
+                if section := section_regex.search(command_section):
+                    section = section[0]
+            if not section:
+                rule_results.update({index: ("SECTION NOT FOUND", None) for index in indexes})
+                continue
+            found, not_found = "YES", "NO"
+        else:
+            section = command_section
+            found, not_found = "YES - NO SECTION", "NO - NO SECTION"
+        # all the `match` of the group are searched with a single scan of the section
+        matches = matcher.find(section)
+        for index in indexes:
+            rule_results[index] = (found if input_strings[index]["match"] in matches else not_found, section)
+
     result = []
-    for log in log_list:
-        for input_string in input_strings:
-            # create a deepcopy to edit the item without affecting input_strings
-            item = copy.deepcopy(input_string)
-            item["hostname"] = log["hostname"]
-            if "command" in item.keys():
-                # we extract the output for the specified command
-                command_pattern = rf'({log["hostname"]}{prompt_delimiter}.{item["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-                command_regex = re.compile(command_pattern, re.MULTILINE)
-                if command_section := command_regex.search(log["text"]):
-                    if "section" in item.keys():
-                        # we extract the section within the output of the command
-                        pattern = rf'(^{item["section"]}.*$[\n\r]*(?:^\s.*$[\n\r]*)*)'
-                        section_regex = re.compile(pattern, re.MULTILINE)
-                        if section := section_regex.search(command_section[0]):
-                            present_in_log = "YES" if item["match"] in section[0] else "NO"
-                            if verbose:
-                                item["matched_section"] = section[0]
-                        else:
-                            present_in_log = "SECTION NOT FOUND"
-                    else:
-                        present_in_log = (
-                            "YES - NO SECTION" if item["match"] in command_section[0] else "NO - NO SECTION"
-                        )
-                        if verbose:
-                            item["matched_section"] = command_section[0]
-                else:
-                    present_in_log = "COMMAND NOT FOUND"
-            else:
-                present_in_log = "COMMAND NOT SPECIFIED"
-            item["found"] = present_in_log
-            result.append(item)
+    for index, input_string in enumerate(input_strings):
+        # copy the item, to edit it without affecting input_strings
+        item = dict(input_string)
+        item["hostname"] = log["hostname"]
+        present_in_log, matched_section = rule_results.get(index, ("COMMAND NOT SPECIFIED", None))
+        if verbose and matched_section is not None:
+            item["matched_section"] = matched_section
+        item["found"] = present_in_log
+        result.append(item)
     return result
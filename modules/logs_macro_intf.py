@@ -1,7 +1,14 @@
 import contextlib
 import re
+from typing import TYPE_CHECKING
 
-from ipfabric import IPFClient
+from modules.check_registry import apply_rules
+from modules.concurrency import map_logs
+from modules.inventory import Inventory
+from modules.log_index import find_command_section
+
+if TYPE_CHECKING:
+    from ipfabric import IPFClient
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -24,29 +31,36 @@ def display_interfaces_macro(result: list):
     print(new_result)
 
 
-def get_device_family(ipf_devices, sn):
-    return [device["family"] for device in ipf_devices if device["sn"] == sn][0]
+def iter_interfaces_macro(
+    ipf_client: "IPFClient",
+    ipf_devices: list,
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+):
+    """Yield the interfaces with a macro of each device, as soon as its log is parsed."""
+    inventory = Inventory.of(ipf_devices)
+    jobs = ((inventory.annotate(log), prompt_delimiter) for log in log_list)
+    for log_result in map_logs(interfaces_macro, jobs, workers):
+        if log_result is not None:
+            yield log_result
 
 
 def search_interfaces_macro(
-    ipf_client: IPFClient,
+    ipf_client: "IPFClient",
     ipf_devices: list,
     log_list,
     prompt_delimiter: str,
     verbose: bool = False,
+    workers: int = 1,
 ):
-    result = []
-    for log in log_list:
-        family = get_device_family(ipf_devices, log["sn"])
-        if family in ["ios-xe", "ios"]:
-            result.append(ios_xe_interfaces_macro(log, prompt_delimiter, family))
-        # elif family == "ios-xr":
-        #     result.append(iosxr_interfaces_macro(log, prompt_delimiter))
-        # elif family == "nx-os":
-        #     result.append(nxos_interfaces_macro(log, prompt_delimiter))
-        # elif family == "eos":
-        #     result.append(eos_interfaces_macro(log, prompt_delimiter))
-    return result
+    return list(iter_interfaces_macro(ipf_client, ipf_devices, log_list, prompt_delimiter, verbose, workers))
+
+
+def interfaces_macro(log, prompt_delimiter: str):
+    """Parse a single log with the function of its family, None if the family is not supported"""
+    return apply_rules(INTERFACES_MACRO_RULES, log, prompt_delimiter)
 
 
 def ios_xe_interfaces_macro(log, prompt_delimiter, family):
@@ -77,12 +91,8 @@ def ios_xe_interfaces_macro(log, prompt_delimiter, family):
         "match": r"(?<!\$INTERFACE)\ninterface (\S+)[\s\S]*?macro description (\S+)",
     }
     # we search and extract the output for the show ip interface command
-
-    command_pattern = rf'(^{log["hostname"]}{prompt_delimiter}.{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-
-    if command_section := command_regex.search(log["text"]):
-        split_commands = command_section[0].split("!\r\n")  # Split the commands based on '!\r\n' delimiter
+    if command_section := find_command_section(log, prompt_delimiter, input_string["command"]):
+        split_commands = command_section.split("!\n")  # Split the commands based on '!\n' delimiter
         interface_blocks = [block for block in split_commands if block.startswith("interface")]  # Filter only
 
         # Initialize a list to store (interface name, description) pairs
@@ -91,7 +101,7 @@ def ios_xe_interfaces_macro(log, prompt_delimiter, family):
         # Iterate through each interface block
         for block in interface_blocks:
             if "macro description" in block:
-                lines = block.split("\r\n")
+                lines = block.split("\n")
                 interface_name = lines[0].split("interface ")[1].strip()
                 for line in lines:
                     if "macro description" in line:
@@ -107,3 +117,12 @@ def ios_xe_interfaces_macro(log, prompt_delimiter, family):
     # output = [{interfaces: macro} for interfaces, macro in matches]
     # output.append({"family": family})
     return {log["hostname"]: interface_macro_pairs}
+
+
+INTERFACES_MACRO_RULES = {
+    "ios-xe": lambda log, prompt_delimiter: ios_xe_interfaces_macro(log, prompt_delimiter, log["family"]),
+    "ios": lambda log, prompt_delimiter: ios_xe_interfaces_macro(log, prompt_delimiter, log["family"]),
+    # "ios-xr": iosxr_interfaces_macro,
+    # "nx-os": nxos_interfaces_macro,
+    # "eos": eos_interfaces_macro,
+}
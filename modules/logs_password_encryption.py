@@ -1,7 +1,15 @@
 import contextlib
 import re
+from typing import TYPE_CHECKING
 
-from ipfabric import IPFClient
+from modules.check_registry import apply_rules
+from modules.concurrency import map_logs
+from modules.inventory import Inventory
+from modules.log_index import find_command_section
+from modules.patterns import compile_pattern
+
+if TYPE_CHECKING:
+    from ipfabric import IPFClient
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -23,29 +31,36 @@ def display_password_encryption(result: list):
     print(result)
 
 
-def get_device_family(ipf_devices, sn):
-    return [device["family"] for device in ipf_devices if device["sn"] == sn][0]
+def iter_password_encryption(
+    ipf_client: "IPFClient",
+    ipf_devices: list,
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+):
+    """Yield the passwords / keys found on each device, as soon as its log is parsed."""
+    inventory = Inventory.of(ipf_devices)
+    jobs = ((inventory.annotate(log), prompt_delimiter) for log in log_list)
+    for log_result in map_logs(password_encryption, jobs, workers):
+        if log_result is not None:
+            yield log_result
 
 
 def find_password_encryption(
-    ipf_client: IPFClient,
+    ipf_client: "IPFClient",
     ipf_devices: list,
     log_list,
     prompt_delimiter: str,
     verbose: bool = False,
+    workers: int = 1,
 ):
-    result = []
-    for log in log_list:
-        family = get_device_family(ipf_devices, log["sn"])
-        if family == "ios-xe":
-            result.append(iosxe_password_encryption(log, prompt_delimiter))
-        elif family == "ios-xr":
-            result.append(iosxr_password_encryption(log, prompt_delimiter))
-        elif family == "nx-os":
-            result.append(nxos_password_encryption(log, prompt_delimiter))
-        elif family == "eos":
-            result.append(eos_password_encryption(log, prompt_delimiter))
-    return result
+    return list(iter_password_encryption(ipf_client, ipf_devices, log_list, prompt_delimiter, verbose, workers))
+
+
+def password_encryption(log, prompt_delimiter: str):
+    """Parse a single log with the function of its family, None if the family is not supported"""
+    return apply_rules(PASSWORD_ENCRYPTION_RULES, log, prompt_delimiter)
 
 
 def iosxe_password_encryption(log, prompt_delimiter):
@@ -73,15 +88,12 @@ def iosxe_password_encryption(log, prompt_delimiter):
     """
     input_string = {
         "command": "show running-config",
-        "match": r"\benable password\s\d\s|username.*password\s\d\s|snmp-server.group.*\n|tacacs.server.*\r|radius.server.dnac*\r|.*key\s\d\s\b",
+        "match": r"\benable password\s\d\s|username.*password\s\d\s|snmp-server.group.*|tacacs.server.*\n|radius.server.dnac*\n|.*key\s\d\s\b",
     }
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'(^{log["hostname"]}{prompt_delimiter}.{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-
-    if command_section := command_regex.search(log["text"]):
-        pattern = re.compile(input_string["match"])
-        matches = pattern.findall(command_section[0])
+    if command_section := find_command_section(log, prompt_delimiter, input_string["command"]):
+        pattern = compile_pattern(input_string["match"])
+        matches = pattern.findall(command_section)
     else:
         return {log["hostname"]: "No matches found"}
 
@@ -91,8 +103,8 @@ def iosxe_password_encryption(log, prompt_delimiter):
         if skip_next:
             skip_next = False
             continue
-        # if it ends with a carriage return, it means it's a multi-line match, in which case we will append the next match to it
-        if match.endswith("\r"):
+        # if it ends with a new line, it means it's a multi-line match, in which case we will append the next match to it
+        if match.endswith("\n"):
             if i < len(matches) - 1:
                 output.append(f"{match.strip()}: {matches[i + 1].strip()}")
                 # key, value = f'{match.strip()}: {matches[i + 1].strip()}'.split(':')
@@ -123,12 +135,10 @@ def iosxr_password_encryption(log, prompt_delimiter):
         "match": r"\busername\s\w+|snmp-server.user.*\n|server-private.*\n|tacacs-server.host.*\n|key.chain.*\n|key-string\s\S+|.*secret\s\d+\s|.*key\s\S\s\S+\b",
     }
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'(:{log["hostname"]}{prompt_delimiter}.{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
     # matches
-    if command_section := command_regex.search(log["text"]):
-        pattern = re.compile(input_string["match"])
-        matches = pattern.findall(command_section[0])
+    if command_section := find_command_section(log, prompt_delimiter, input_string["command"]):
+        pattern = compile_pattern(input_string["match"])
+        matches = pattern.findall(command_section)
     else:
         return {log["hostname"]: "No matches found"}
 
@@ -190,12 +200,10 @@ def nxos_password_encryption(log, prompt_delimiter):
         "match": r"\busername\s[\w\S]+\s\w+\s\d+|tacacs-server\shost\s\S+\skey\s\d+|snmp-server\suser\s[\w\S]+.*auth\s\w+\b",
     }
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'({log["hostname"]}{prompt_delimiter}\s{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
     # matches
-    if command_section := command_regex.search(log["text"]):
-        pattern = re.compile(input_string["match"])
-        matches = pattern.findall(command_section[0])
+    if command_section := find_command_section(log, prompt_delimiter, input_string["command"]):
+        pattern = compile_pattern(input_string["match"])
+        matches = pattern.findall(command_section)
     else:
         return {log["hostname"]: "No matches found"}
 
@@ -221,14 +229,20 @@ def eos_password_encryption(log, prompt_delimiter):
         "match": r"\busername.*secret\s\w+|tacacs-server\shost\s.*key\s\w+\s|.*\w+\skey\s\w+\s|.*\w+\spassword\s\w+\s|snmp-server\suser\s[\w\S]+.*auth\s\w+\b",
     }
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'(^{log["hostname"]}{prompt_delimiter}.{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
     # matches
-    if command_section := command_regex.search(log["text"]):
-        pattern = re.compile(input_string["match"])
-        matches = pattern.findall(command_section[0])
+    if command_section := find_command_section(log, prompt_delimiter, input_string["command"]):
+        pattern = compile_pattern(input_string["match"])
+        matches = pattern.findall(command_section)
     else:
         return {log["hostname"]: "No matches found"}
 
     output = [match.strip() for match in matches]
     return {log["hostname"]: output}
+
+
+PASSWORD_ENCRYPTION_RULES = {
+    "ios-xe": iosxe_password_encryption,
+    "ios-xr": iosxr_password_encryption,
+    "nx-os": nxos_password_encryption,
+    "eos": eos_password_encryption,
+}
@@ -12,9 +12,12 @@ Administrative Mode: static access
 """
 
 import contextlib
-import copy
 import re
 
+from modules.concurrency import TIMEOUT, map_logs
+from modules.log_index import find_command_section
+from modules.patterns import compile_pattern
+
 with contextlib.suppress(ImportError):
     from rich import print
 
@@ -34,28 +37,55 @@ def display_switchport_log_compliance(result: list):
     print(result_nok)
 
 
-def get_device_interfaces(device: str, switchport_interfaces: list):
-    """Returns a list of interface names for a given device.
+def group_interfaces_by_hostname(switchport_interfaces: list):
+    """Returns the interface names of the switchport interfaces, grouped by hostname.
 
     Args:
     ----
-        device (str): The hostname of the device.
         switchport_interfaces (list): A list of switchport interfaces.
 
     Returns:
     -------
-        list: A list of interface names for the given device.
+        dict: The list of interface names for each hostname.
 
     Examples:
     --------
-        >>> get_device_interfaces('device1', [{'hostname': 'device1', 'intName': 'GigabitEthernet1/0/1'}, {'hostname': 'device2', 'intName': 'GigabitEthernet1/0/2'}])
-        ['GigabitEthernet1/0/1']
+        >>> group_interfaces_by_hostname([{'hostname': 'device1', 'intName': 'GigabitEthernet1/0/1'}, {'hostname': 'device2', 'intName': 'GigabitEthernet1/0/2'}])
+        {'device1': ['GigabitEthernet1/0/1'], 'device2': ['GigabitEthernet1/0/2']}
 
     """
-    return [interface["intName"] for interface in switchport_interfaces if interface["hostname"] == device]
+    interfaces_by_hostname = {}
+    for interface in switchport_interfaces:
+        interfaces_by_hostname.setdefault(interface["hostname"], []).append(interface["intName"])
+    return interfaces_by_hostname
+
+
+def split_switchport_blocks(command_section: str):
+    """Split the `show interface switchport` output in one block per interface, in one pass.
+
+    Each block goes from its `Name: <interface>` line to the next one (or the end of the output).
 
+    Examples:
+    --------
+        >>> split_switchport_blocks("Name: Gi1/0/1\\nSwitchport: Enabled\\nName: Gi1/0/2\\nSwitchport: Disabled\\n")
+        {'Gi1/0/1': 'Name: Gi1/0/1\\nSwitchport: Enabled\\n', 'Gi1/0/2': 'Name: Gi1/0/2\\nSwitchport: Disabled\\n'}
 
-def search_switchport_logs(log_list, prompt_delimiter: str, switchport_interfaces: list, verbose: bool = False):
+    """
+    blocks = {}
+    headers = list(compile_pattern(r"^Name: (\S+)", re.MULTILINE).finditer(command_section))
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        end = next_header.start() if next_header else len(command_section)
+        blocks.setdefault(header[1], command_section[header.start() : end])
+    return blocks
+
+
+def search_switchport_logs(
+    log_list,
+    prompt_delimiter: str,
+    switchport_interfaces: list,
+    verbose: bool = False,
+    workers: int = 1,
+):
     # sourcery skip: low-code-quality
     """A function to search for a specific list of string within the list of log files.
 
@@ -65,47 +95,63 @@ def search_switchport_logs(log_list, prompt_delimiter: str, switchport_interface
         the list of strings to search for
     log_list: list of objects
         object items containing hostnames, log files, ..
+    workers: int
+        number of processes parsing the logs, 1 keeps it serial
 
     """
+    return list(iter_switchport_interfaces(log_list, prompt_delimiter, switchport_interfaces, verbose, workers))
+
+
+def iter_switchport_interfaces(
+    log_list,
+    prompt_delimiter: str,
+    switchport_interfaces: list,
+    verbose: bool = False,
+    workers: int = 1,
+):
+    """Generator version of `search_switchport_logs`, yielding the interfaces of each device once parsed."""
+    # The switchport interfaces are grouped per device once, the logs are parsed by the workers
+    interfaces_by_hostname = group_interfaces_by_hostname(switchport_interfaces)
+    jobs = (
+        (log, interfaces_by_hostname.get(log["hostname"], []), prompt_delimiter, verbose)
+        for log in log_list
+    )
+
+    def timeout_rows(log):
+        interfaces = interfaces_by_hostname.get(log["hostname"], [])
+        return [{"hostname": log["hostname"], "interface": interface, "access": TIMEOUT} for interface in interfaces]
+
+    for log_result in map_logs(switchport_access, jobs, workers, on_timeout=timeout_rows):
+        print(".", end="")
+        yield from log_result
+    print(" done!")
+
+
+def switchport_access(log, device_interfaces: list, prompt_delimiter: str, verbose: bool = False):
+    """Check, in a single log, if each of the switchport interfaces is an access port or not"""
     result = []
     input_string = {
         "command": "show interface switchport",
         "match": "Administrative Mode: .*access",
     }  # technically we also need to search for "Administrative Mode: access" maybe play with regex once it's working
-    for log in log_list:
-        # debug()
-        # for input_string in input_strings:
-        # create a deepcopy to edit the item without affecting input_strings
-        # if "command" in item.keys():
-        # we extract the output for the specified command
-        command_pattern = rf'({log["hostname"]}{prompt_delimiter}.{input_string["command"]}.*[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-        command_regex = re.compile(command_pattern, re.MULTILINE)
-        # Now we get the listi of interfaces for the device
-        device_interfaces = get_device_interfaces(log["hostname"], switchport_interfaces)
-        print(".", end="")
-        for interface in device_interfaces:
-            if command_section := command_regex.search(log["text"]):
-                item = copy.deepcopy(input_string)
-                item["hostname"] = log["hostname"]
-                # we extract the section within the output of the command
-                item["interface"] = interface
-                pattern = rf"(^Name: {interface}([\s\S]*)Name:)"
-                section_regex = re.compile(pattern, re.MULTILINE)
-                if section := section_regex.search(command_section[0]):
-                    # we search for `Administrative Mode: .*access` within the section
-                    present_in_log = "YES" if re.search(item["match"], section[0]) else "NO"
-                    if verbose:
-                        item["matched_section"] = section[0]
-                else:
-                    present_in_log = "NOT IN SWITCHPORT OUTPUT"
-
+    match_regex = compile_pattern(input_string["match"])
+    # we extract the output for the specified command, and split it per interface
+    command_section = find_command_section(log, prompt_delimiter, input_string["command"])
+    interface_blocks = split_switchport_blocks(command_section) if command_section else {}
+    for interface in device_interfaces:
+        item = {"hostname": log["hostname"], "interface": interface}
+        if command_section:
+            # we extract the section of the interface within the output of the command
+            if section := interface_blocks.get(interface):
+                # we search for `Administrative Mode: .*access` within the section
+                present_in_log = "YES" if match_regex.search(section) else "NO"
+                if verbose:
+                    item["matched_section"] = section
             else:
-                present_in_log = "COMMAND NOT FOUND"
-            item["access"] = present_in_log
-            if "command" in item.keys():
-                del item["command"]
-            if "match" in item.keys():
-                del item["match"]
-            result.append(item)
-    print(" done!")
+                present_in_log = "NOT IN SWITCHPORT OUTPUT"
+
+        else:
+            present_in_log = "COMMAND NOT FOUND"
+        item["access"] = present_in_log
+        result.append(item)
     return result
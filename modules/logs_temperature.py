@@ -1,7 +1,13 @@
 import contextlib
+import json
 import re
 
-import pandas as pd
+from modules.check_registry import apply_rules
+from modules.columnar import TEMPERATURE_COLUMNS, export_parquet
+from modules.concurrency import TIMEOUT, map_logs
+from modules.inventory import Inventory
+from modules.log_index import find_command_section
+from modules.patterns import compile_pattern
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -23,45 +29,64 @@ def display_temperature(result: list):
     print(result)
 
 
-def get_device_family(ipf_devices, sn):
-    return [device["family"] for device in ipf_devices if device["sn"] == sn][0]
-
-
 def save_to_csv(result, title: str):
-    # use pandas to save the result to a csv file
+    # use pandas to save the result to a csv file (imported here, only when a CSV file is written)
+    import pandas as pd
+
     df = pd.DataFrame(result)
     df.to_csv(f"{title}.csv", index=False)
 
 
+def iter_temperature(
+    ipf_devices: list,
+    log_list,
+    prompt_delimiter: str,
+    verbose: bool = False,
+    workers: int = 1,
+):
+    """Yield the temperature sensors, device by device, as the logs are parsed."""
+    inventory = Inventory.of(ipf_devices)
+    jobs = ((inventory.annotate(log), prompt_delimiter) for log in log_list)
+
+    def timeout_rows(log):
+        return [{"device": log["hostname"], "status": TIMEOUT}]
+
+    for log_result in map_logs(temperature, jobs, workers, on_timeout=timeout_rows):
+        yield from log_result
+
+
 def find_temperature(
     ipf_devices: list,
     log_list,
     prompt_delimiter: str,
     verbose: bool = False,
+    workers: int = 1,
+    file_format: str = "csv",
 ):
-    result = []
-    for log in log_list:
-        family = get_device_family(ipf_devices, log["sn"])
-        if family == "ios-xe":
-            result.extend(iosxe_temperature(log=log, prompt_delimiter=prompt_delimiter))
-        # IOS-XR not available as IPF does not execute the right command
-        elif family in ["nx-os", "aci"]:
-            result.extend(nxos_temperature(log=log, prompt_delimiter=prompt_delimiter))
-        elif family == "junos":
-            result.extend(junos_temperature(log, prompt_delimiter))
+    rows = iter_temperature(ipf_devices, log_list, prompt_delimiter, verbose, workers)
+    if file_format == "parquet":
+        # the rows are written in row groups as the devices are parsed
+        result = list(export_parquet(rows, "temperature.parquet", TEMPERATURE_COLUMNS))
+        print("Saved as Parquet file: temperature.parquet")
+        return result
+    result = list(rows)
     try:
         save_to_csv(result, "temperature")
     except Exception as e:
         print(f"Error saving to CSV: {e}")
         # save as a json file
         with open("temperature.json", "w") as f:
-            json_result = str(result).replace("'", '"')
-            f.write(json_result)
+            json.dump(result, f)
         print("Saved as JSON file")
-    
+
     return result
 
 
+def temperature(log, prompt_delimiter: str):
+    """Parse a single log with the function of its family, [] if the family is not supported"""
+    return apply_rules(TEMPERATURE_RULES, log, prompt_delimiter, default=[])
+
+
 # def iosxr_temperature(log, prompt_delimiter):
 #     """Searches for specific patterns in a log text and extracts relevant information.
 
@@ -146,15 +171,11 @@ def nxos_temperature(log, prompt_delimiter: str = "#"):
         "command": "show environment",
         "pattern": r"Temperature:?\n-+\nModule\s+Sensor\s+MajorThresh\s+MinorThres\s+CurTemp\s+Status\n\s*\(Celsius\)\s*\(Celsius\)\s*\(Celsius\)\s*\n-+\n(.*?)(?:\r|\n{2}|\n$)",
     }
-    full_logs = log["text"].replace("\x07", "")
     device_hostname = log["hostname"].split(".")[0]
     # we search and extract the output for the specific command
-    command_pattern = (
-        rf'({device_hostname}\S*{prompt_delimiter}\s*{input_string["command"]}.*?(?={device_hostname}\S*{prompt_delimiter}))'
-    )
-    command_regex = re.compile(command_pattern, re.DOTALL)
-
-    if not (command_section := command_regex.search(full_logs)):
+    if not (
+        command_section := find_command_section(log, prompt_delimiter, input_string["command"], hostname=device_hostname)
+    ):
         print(f"command not found for {device_hostname}")
         return [{
             "device": device_hostname,
@@ -166,10 +187,9 @@ def nxos_temperature(log, prompt_delimiter: str = "#"):
         }]
     
     # Find all temperature sections
-    command_section = command_section[0].replace("\r\n", "\n")
-    regex_split = re.compile(r'\s{2,}')
+    regex_split = compile_pattern(r'\s{2,}')
     temperatures_result = []
-    if temp_match := re.search(input_string["pattern"], command_section, re.DOTALL):
+    if temp_match := compile_pattern(input_string["pattern"], re.DOTALL).search(command_section):
         for line in temp_match[1].strip().split("\n"):
             # sometimes the curTemp is not a digit but a string, due to some sensor name in ACI
             # the regex would need improving, but in the meantime, the workaround below seems ok
@@ -194,9 +214,9 @@ def nxos_temperature(log, prompt_delimiter: str = "#"):
     }
 
     # we search and extract the output for the specific command
-    command_pattern = rf'({device_hostname}\S*{prompt_delimiter}\s*{input_string["command"]}.*?[\s\S]*?(?={device_hostname}\S*{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-    if not (command_section := command_regex.search(full_logs)):
+    if not (
+        command_section := find_command_section(log, prompt_delimiter, input_string["command"], hostname=device_hostname)
+    ):
         print(f"command not found for {device_hostname}")
         return [{
             "device": device_hostname,
@@ -206,17 +226,16 @@ def nxos_temperature(log, prompt_delimiter: str = "#"):
             "curTemp": "not found",
             "status": "not found",
         }]
-    command_section = command_section[0].replace("\r\n", "\n")
 
     # Find all FEX sections
-    fex_matches = re.finditer(input_string["fex_pattern"], command_section, re.DOTALL)
+    fex_matches = compile_pattern(input_string["fex_pattern"], re.DOTALL).finditer(command_section)
 
     for fex_match in fex_matches:
         fex_number = fex_match.group(1)
         sensor_data_block = fex_match.group(2)
 
         # Find all sensor matches in the current FEX block
-        sensor_matches = re.finditer(input_string["sensor_pattern"], sensor_data_block)
+        sensor_matches = compile_pattern(input_string["sensor_pattern"]).finditer(sensor_data_block)
         # Prepare the list for the current FEX
         # result[f"{log['hostname']}-FEX{fex_number}"] = []
         for match in sensor_matches:
@@ -255,15 +274,11 @@ def junos_temperature(log, prompt_delimiter: str = "#"):
         # "match": r'(?P<location>[\w\s]+\d+)\s+(?P<sensor>[\w\s\-]+)\s+(?P<status>\w+)\s+(?P<curTemp>\d+)\s+degrees\s+C', #AI option4
         "match": r"(?=.*degrees\s+C)(?P<location>(?<!Temp)\s+(\w+\s\d+))\s+(?P<sensor>.*?)\s{2,}(?P<status>\w+)\s+(?P<curTemp>\d+)\s+degrees\s+C",  # AI option5 with lookahed
     }
-    full_logs = log["text"].replace("\x07", "")
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'({log["hostname"]}{prompt_delimiter}\s*{input_string["command"]}.*?[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-    if not (command_section := command_regex.search(full_logs)):
+    if not (command_section := find_command_section(log, prompt_delimiter, input_string["command"])):
         return {log["hostname"]: "No matches found"}
-    command_section = command_section[0].replace("\r\n", "\n")
 
-    pattern = re.compile(input_string["match"], re.MULTILINE)
+    pattern = compile_pattern(input_string["match"], re.MULTILINE)
     return [
         {
             "device": log["hostname"],
@@ -294,15 +309,11 @@ def iosxe_temperature(log, prompt_delimiter: str = "#"):
         "command": "show env all",
         "match": r"Temp: (?P<sensor>[\w\s]+?)(?:\s{2,})(?P<location>\w+)\s+(?P<status>[\w\s]+)\s+(?P<curTemp>\d+)\s+Celsius",
     }
-    full_logs = log["text"].replace("\x07", "")
     # we search and extract the output for the show ip interface command
-    command_pattern = rf'({log["hostname"]}{prompt_delimiter}\s*{input_string["command"]}.*?[\s\S]*?(?={log["hostname"]}{prompt_delimiter}))'
-    command_regex = re.compile(command_pattern, re.MULTILINE)
-    if not (command_section := command_regex.search(full_logs)):
+    if not (command_section := find_command_section(log, prompt_delimiter, input_string["command"])):
         return {log["hostname"]: "No matches found"}
-    command_section = command_section[0].replace("\r\n", "\n")
 
-    pattern = re.compile(input_string["match"], re.MULTILINE)
+    pattern = compile_pattern(input_string["match"], re.MULTILINE)
     result = [
         {
             "device": log["hostname"],
@@ -318,7 +329,7 @@ def iosxe_temperature(log, prompt_delimiter: str = "#"):
     if not result:
         cat9k_pattern = r"(?P<sensor>.+?)\s+(?P<location>\d+)\s+(?P<status>\w+)\s+(?P<curTemp>\d+)\sCelsius\s+(?P<minorThresh>\d)+\s*-\s*(?P<majorThresh>\d)+"
 
-        pattern = re.compile(cat9k_pattern, re.MULTILINE)
+        pattern = compile_pattern(cat9k_pattern, re.MULTILINE)
         result = [
             {
                 "device": log["hostname"],
@@ -334,3 +345,12 @@ def iosxe_temperature(log, prompt_delimiter: str = "#"):
 
 # def ios_temperature(log, prompt_delimiter: str = "#"):
 #     # Not implemented, it's currently a copy/paste of the iosxr regex, there are a lot of different output depending on the model with IOS.
+
+
+# IOS-XR not available as IPF does not execute the right command
+TEMPERATURE_RULES = {
+    "ios-xe": iosxe_temperature,
+    "nx-os": nxos_temperature,
+    "aci": nxos_temperature,
+    "junos": junos_temperature,
+}
@@ -0,0 +1,96 @@
+"""Find many literal strings in a text with a single scan (Aho-Corasick).
+
+Used by `search_logs` when a lot of `INPUT_DATA` rules look for their `match` in
+the same (command, section): the automaton is built once per run, and all the
+`match` literals of the group are found with one pass over the section, instead
+of one `in` per rule.
+"""
+
+from collections import deque
+
+# Under this number of literals, one `in` per literal (done in C) is faster than
+# walking the automaton in Python: measured with `benchmarks.bench_multi_match`, the
+# automaton wins from 300 to 600 literals depending on the size of the text
+MIN_PATTERNS = 400
+
+
+class AhoCorasick:
+    """Automaton matching a set of literal patterns.
+
+    Examples:
+    --------
+        >>> automaton = AhoCorasick(["no ip http server", "ntp server", "snmp"])
+        >>> sorted(automaton.find("ntp server 10.0.10.10\\nno ip http server\\n"))
+        ['no ip http server', 'ntp server']
+
+    The empty pattern is in any text, like `"" in text`:
+
+        >>> sorted(AhoCorasick(["", "snmp"]).find("ntp server")), sorted(AhoCorasick(["", "snmp"]).find(""))
+        ([''], [''])
+
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(patterns))
+        self.has_empty = "" in self.patterns
+        # goto[state] maps a character to the next state, output[state] is the list
+        # of patterns ending at this state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern in self.patterns:
+            if not pattern:
+                # found before the scan, see `find`
+                continue
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(pattern)
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> set:
+        """Return the set of patterns found in the text."""
+        found = {""} if self.has_empty else set()
+        if len(found) == len(self.patterns):
+            return found
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+                if len(found) == len(self.patterns):
+                    break
+        return found
+
+
+class MultiMatcher:
+    """Find which of the literals are in a text, with the fastest method for their number."""
+
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(patterns))
+        self.automaton = AhoCorasick(self.patterns) if len(self.patterns) >= MIN_PATTERNS else None
+
+    def find(self, text: str) -> set:
+        if self.automaton is not None:
+            return self.automaton.find(text)
+        return {pattern for pattern in self.patterns if pattern in text}
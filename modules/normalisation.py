@@ -0,0 +1,33 @@
+"""Normalisation of the text of the logs, done once when a log is downloaded.
+
+The logs are a capture of the terminal sessions: they hold bell chars, CRLF line
+endings and, for some families (arubasw, arubacx), ANSI/CSI control sequences
+interleaved with the text. They are cleaned once here, before being cached in
+memory or handed to the checks, so the parsers read plain text with `\\n` line
+endings, instead of each of them cleaning the whole log again.
+"""
+
+import re
+
+# Matches ANSI/CSI terminal control sequences (cursor moves, screen clears...),
+# e.g. "\x1b[150;1H", "\x1b[2K", "\x1b[?25h"
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+
+# Characters removed in a single `str.translate` pass: the bell, and the carriage
+# return of the CRLF line endings (a lone one, left by a pager, is removed as well)
+_REMOVED_CHARS = str.maketrans("", "", "\x07\r")
+
+
+def normalise_text(text: str) -> str:
+    """Return the text of a log without bell chars, carriage returns and ANSI/CSI sequences.
+
+    Examples:
+    --------
+        >>> normalise_text("SW1# show versi\\x1b[24;13Hon\\r\\n\\x07Boot ROM Version: K.16\\r\\n")
+        'SW1# show version\\nBoot ROM Version: K.16\\n'
+
+    """
+    text = text.translate(_REMOVED_CHARS)
+    if "\x1b" in text:
+        text = ANSI_ESCAPE.sub("", text)
+    return text
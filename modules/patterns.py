@@ -0,0 +1,233 @@
+"""Cache of the compiled regex patterns, shared by all the parsers.
+
+Python's own `re` cache is small, and the parsers build a lot of patterns per
+device, per rule or per interface, so the same patterns were recompiled over and
+over. The patterns are compiled once per run here, and the values which change
+per device (hostname, interface) are bound by position instead of being pasted
+in a new pattern.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 1024
+
+# Continuation of a block starting at the current position: the rest of the header
+# line, then all the following indented lines (the section of an interface, of a
+# `router bgp`...)
+INDENTED_BLOCK = r".*$[\n\r]*(?:^\s.*$[\n\r]*)*"
+
+
+class PatternCache:
+    """Bounded, LRU, cache of compiled patterns keyed by (pattern, flags)."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._patterns = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, pattern: str, flags: int = 0) -> re.Pattern:
+        key = (pattern, flags)
+        with self._lock:
+            if (compiled := self._patterns.get(key)) is not None:
+                self._patterns.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        compiled = re.compile(pattern, flags)
+        with self._lock:
+            self._patterns[key] = compiled
+            if len(self._patterns) > self.max_size:
+                self._patterns.popitem(last=False)
+        return compiled
+
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._patterns), "max_size": self.max_size}
+
+    def clear(self):
+        with self._lock:
+            self._patterns.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+PATTERN_CACHE = PatternCache()
+
+
+def compile_pattern(pattern: str, flags: int = 0) -> re.Pattern:
+    """Return the compiled pattern, from the shared cache."""
+    return PATTERN_CACHE.compile(pattern, flags)
+
+
+def pattern_cache_info() -> dict:
+    """Return the hit/miss statistics of the shared cache."""
+    return PATTERN_CACHE.info()
+
+
+def find_indented_block(text: str, header: str):
+    """Return the first block whose header line starts with `header`, or None.
+
+    Same as searching `(^{header}.*$[\\n\\r]*(?:^\\s.*$[\\n\\r]*)*)` with re.MULTILINE,
+    but `header` is a literal (an interface name...): it's looked up with `str.find`
+    and the block is matched with a single pattern compiled once.
+
+    Examples:
+    --------
+        >>> find_indented_block("Gi1 is up\\n  MTU 1500\\nGi2 is up\\n", "Gi1")
+        'Gi1 is up\\n  MTU 1500\\n'
+
+    """
+    if text.startswith(header):
+        position = 0
+    elif (position := text.find(f"\n{header}")) != -1:
+        position += 1
+    else:
+        return None
+    block = compile_pattern(INDENTED_BLOCK, re.MULTILINE).match(text, position + len(header))
+    return text[position : block.end()]
+
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+_REPEATS = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+# Characters used to tell whether two parts of a pattern can match the same character
+_SAMPLE = [chr(code) for code in range(32, 127)] + ["\t", "\n", "\r", "é"]
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: str.isdigit,
+    sre_parse.CATEGORY_NOT_DIGIT: lambda char: not char.isdigit(),
+    sre_parse.CATEGORY_SPACE: str.isspace,
+    sre_parse.CATEGORY_NOT_SPACE: lambda char: not char.isspace(),
+    sre_parse.CATEGORY_WORD: lambda char: char.isalnum() or char == "_",
+    sre_parse.CATEGORY_NOT_WORD: lambda char: not (char.isalnum() or char == "_"),
+}
+
+
+def lint_pattern(pattern: str, flags: int = 0) -> list:
+    """Return the shapes of `pattern` prone to catastrophic backtracking, [] if none.
+
+    Three shapes are reported: a repeat nested in an unbounded repeat (`(a+)+`,
+    `(\\s*\\w+)*`), an unbounded repeat of alternatives starting with the same
+    characters (`(a|ab)*`), and two adjacent unbounded repeats of overlapping
+    characters (`.*.*`, `\\s*\\s+`). On a line that doesn't match, the time taken by
+    the first one grows exponentially with the length of the line, and polynomially
+    for the others. An invalid pattern raises `re.error`.
+
+    Examples:
+    --------
+        >>> lint_pattern(r"(\\w+\\s?)+$")
+        ['nested quantifier: an unbounded repeat contains another repeat']
+        >>> lint_pattern(r"^interface Gi.*$")
+        []
+
+    """
+    problems = []
+    _lint_sequence(sre_parse.parse(pattern, flags), problems)
+    return list(dict.fromkeys(problems))
+
+
+def _is_unbounded(node) -> bool:
+    return node[0] in _REPEATS and node[1][1] == sre_parse.MAXREPEAT
+
+
+def _lint_sequence(items, problems: list):
+    items = list(items)
+    for position, (op, av) in enumerate(items):
+        if op in _REPEATS:
+            if av[1] == sre_parse.MAXREPEAT:
+                if _contains_repeat(av[2]):
+                    problems.append("nested quantifier: an unbounded repeat contains another repeat")
+                if _has_overlapping_branches(av[2]):
+                    problems.append("overlapping alternatives repeated without bound")
+                if position + 1 < len(items) and _is_unbounded(items[position + 1]):
+                    if _first_chars(av[2]) & _first_chars(items[position + 1][1][2]):
+                        problems.append("adjacent unbounded repeats of overlapping characters")
+            _lint_sequence(av[2], problems)
+        elif op == sre_parse.SUBPATTERN:
+            _lint_sequence(av[-1], problems)
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                _lint_sequence(branch, problems)
+        elif op in (sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            _lint_sequence(av[1], problems)
+
+
+def _contains_repeat(items) -> bool:
+    """True if a part of `items` can match a variable number of times."""
+    for op, av in items:
+        if op in _REPEATS and av[0] != av[1]:
+            return True
+        if op in _REPEATS and _contains_repeat(av[2]):
+            return True
+        if op == sre_parse.SUBPATTERN and _contains_repeat(av[-1]):
+            return True
+        # an empty alternative makes the group optional, like `?` (`(?:|b)`)
+        if op == sre_parse.BRANCH and any(not branch or _contains_repeat(branch) for branch in av[1]):
+            return True
+    return False
+
+
+def _has_overlapping_branches(items) -> bool:
+    """True if `items` is (or is a group of) alternatives, two of them starting with the same character."""
+    items = list(items)
+    while len(items) == 1 and items[0][0] == sre_parse.SUBPATTERN:
+        items = list(items[0][1][-1])
+    if len(items) != 1 or items[0][0] != sre_parse.BRANCH:
+        return False
+    seen = set()
+    for branch in items[0][1][1]:
+        chars = _first_chars(branch)
+        if chars & seen:
+            return True
+        seen |= chars
+    return False
+
+
+def _first_chars(items) -> set:
+    """Characters of `_SAMPLE` the sequence `items` can start with (approximation)."""
+    chars = set()
+    for op, av in items:
+        if op in _REPEATS:
+            chars |= _first_chars(av[2])
+            if av[0] > 0:
+                return chars
+        elif op == sre_parse.SUBPATTERN:
+            chars |= _first_chars(av[-1])
+            return chars
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                chars |= _first_chars(branch)
+            return chars
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue
+        else:
+            return chars | {char for char in _SAMPLE if _matches_char(op, av, char)}
+    return chars
+
+
+def _matches_char(op, av, char: str) -> bool:
+    if op == sre_parse.ANY:
+        return char != "\n"
+    if op == sre_parse.LITERAL:
+        return chr(av) == char
+    if op == sre_parse.NOT_LITERAL:
+        return chr(av) != char
+    if op == sre_parse.IN:
+        negate = bool(av) and av[0][0] == sre_parse.NEGATE
+        found = any(_in_item(item_op, item_av, char) for item_op, item_av in av if item_op != sre_parse.NEGATE)
+        return found != negate
+    # backreference, conditional...: assume it can match anything
+    return True
+
+
+def _in_item(op, av, char: str) -> bool:
+    if op == sre_parse.RANGE:
+        return av[0] <= ord(char) <= av[1]
+    if op == sre_parse.CATEGORY:
+        return _CATEGORIES.get(av, lambda _: True)(char)
+    return _matches_char(op, av, char)
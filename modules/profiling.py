@@ -0,0 +1,101 @@
+"""Timing of the phases of a run, and of the parsing of each device (`--profile`).
+
+The phases (inventory, API lookups, download, normalisation, parsing of each check,
+output) are timed with `phase(name)`, which does nothing unless the profiler is
+enabled. The phases can be nested: the time of a phase excludes the time of the
+phases run within it, e.g. the download of the logs, streamed while a check parses
+them, is not counted in the parsing of the check.
+"""
+
+import contextlib
+import time
+from collections import defaultdict
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+
+class Profiler:
+    """Wall / CPU time and bytes handled per phase, and parse time per device."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.phases = defaultdict(lambda: {"wall": 0.0, "cpu": 0.0, "bytes": 0, "calls": 0})
+        self.devices = []
+        # time spent in the nested phases, for each phase of the stack
+        self._stack = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        self._stack.append([0.0, 0.0])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            nested_wall, nested_cpu = self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += wall
+                self._stack[-1][1] += cpu
+            stats = self.phases[name]
+            stats["wall"] += wall - nested_wall
+            stats["cpu"] += cpu - nested_cpu
+            stats["calls"] += 1
+
+    def add_bytes(self, name: str, size: int):
+        if self.enabled:
+            self.phases[name]["bytes"] += size
+
+    def timed_iter(self, iterable, name: str):
+        """Yield the items of `iterable` (logs), counting the time spent producing them in the phase."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                log = next(iterator, None)
+            if log is None:
+                return
+            self.add_bytes(name, log.get("size", 0))
+            yield log
+
+    def device_timer(self, check: str):
+        """Return the `time_logs` callback recording the parse time of each device for the check."""
+
+        def record(log, seconds: float):
+            self.devices.append((seconds, check, log["hostname"], log.get("size", 0)))
+            self.add_bytes(f"parse: {check}", log.get("size", 0))
+
+        return record
+
+    def report(self, top: int = 10):
+        """Print the time per phase, and the `top` slowest devices to parse."""
+        total = sum(stats["wall"] for stats in self.phases.values())
+        print("\n=========== PROFILE ===========")
+        print(f"{'PHASE':<36}{'WALL (s)':>10}{'CPU (s)':>10}{'WALL %':>8}{'MB':>10}{'MB/S':>10}")
+        for name, stats in self.phases.items():
+            megabytes = stats["bytes"] / 1024 / 1024
+            volume = f"{megabytes:.2f}" if stats["bytes"] else ""
+            rate = f"{megabytes / stats['wall']:.2f}" if stats["bytes"] and stats["wall"] else ""
+            share = stats["wall"] / total * 100 if total else 0
+            print(f"{name:<36}{stats['wall']:>10.2f}{stats['cpu']:>10.2f}{share:>7.0f}%{volume:>10}{rate:>10}")
+        print("(the CPU time is the one of the main process, the parsing in the --workers processes is not in it)")
+        if self.devices:
+            print(f"\n{top} slowest devices to parse:")
+            print(f"{'CHECK':<28}{'HOSTNAME':<40}{'PARSE (s)':>10}{'MB':>9}{'MB/S':>9}")
+            for seconds, check, hostname, size in sorted(self.devices, reverse=True)[:top]:
+                megabytes = size / 1024 / 1024
+                rate = f"{megabytes / seconds:.2f}" if seconds else ""
+                print(f"{check:<28}{hostname:<40}{seconds:>10.3f}{megabytes:>9.2f}{rate:>9}")
+
+
+PROFILER = Profiler()
+
+
+def phase(name: str):
+    """Time a phase of the run with the shared profiler (no-op unless `--profile`)."""
+    return PROFILER.phase(name)
@@ -0,0 +1,69 @@
+"""Streaming writer of the result rows, in JSON lines (NDJSON), for `--file-output`.
+
+Instead of collecting all the rows and dumping them once at the end, each row is
+written as soon as the log of its device is parsed: the memory used doesn't
+depend on the number of rows, and a run dying halfway still leaves the rows of
+the devices already parsed on the disk. The file can be gzipped on the fly.
+"""
+
+import gzip
+import json
+import time
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")
+
+
+def is_ndjson_output(file_output: str) -> bool:
+    """Return True if the output file is a JSON lines file (optionally gzipped), from its extension.
+
+    Examples:
+    --------
+        >>> is_ndjson_output("result.jsonl.gz"), is_ndjson_output("result.json")
+        (True, False)
+
+    """
+    return bool(file_output) and file_output.lower().endswith(NDJSON_EXTENSIONS)
+
+
+class NdjsonWriter:
+    """Write one JSON document per line, flushed every `flush_rows` rows or `flush_seconds`.
+
+    With several checks, each row is tagged with the name of its check (`"check"`).
+    """
+
+    def __init__(self, path: str, flush_rows: int = 1000, flush_seconds: float = 5.0):
+        self.path = path
+        self.rows = 0
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        if path.lower().endswith(".gz"):
+            self._file = gzip.open(path, "wt", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, row, check: str = None):
+        if check is not None:
+            row = {"check": check, **row} if isinstance(row, dict) else {"check": check, "row": row}
+        self._file.write(json.dumps(row))
+        self._file.write("\n")
+        self.rows += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        # a gzip file is flushed with a sync flush, the data written so far can be decompressed
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,253 @@
+"""Service mode (`--serve`): the checks are run on request, by a process kept running.
+
+Most of the time of a run goes before the first log is parsed: the client is created,
+the inventory fetched, the logs downloaded. The service does it once, then keeps the
+client, the inventory of each device filter and the logs (`MemoryLogCache`) in memory
+for the following requests, made over HTTP on a local port or a Unix socket:
+
+    POST /search   {"checks": ["temperature", "os-details"], "device_filter": {...},
+                    "input_data": [...], "verbose": false}
+    GET  /status
+
+All the fields of a search are optional: the checks default to the INPUT_DATA search,
+the device filter and the INPUT_DATA to the ones of the .env. The response is
+`{"result": {check: [rows]}, "warnings": [...], "seconds": ...}`, the rows being the
+ones of the JSON lines output (`--file-output *.jsonl`).
+
+The requests are handled one at a time, in the main thread, where the time budget
+of the parsing (`--time-budget`) applies.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socketserver
+import stat
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+with contextlib.suppress(ImportError):
+    from rich import print
+
+DEFAULT_HOST = "127.0.0.1"
+# Number of device filters whose inventory is kept, the least recently used is dropped
+MAX_INVENTORIES = 16
+
+
+def parse_address(address: str):
+    """Return the (host, port) to listen on, or the path of the Unix socket.
+
+    Examples:
+    --------
+        >>> parse_address("8080"), parse_address("0.0.0.0:8080"), parse_address("/run/search-log.sock")
+        (('127.0.0.1', 8080), ('0.0.0.0', 8080), '/run/search-log.sock')
+
+    """
+    if "/" in address:
+        return address
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_HOST, int(port)
+
+
+def check_input_data(input_data):
+    """Raise ValueError if the INPUT_DATA rules of a request are malformed.
+
+    Examples:
+    --------
+        >>> check_input_data([{"command": "show version", "match": "uptime"}])
+        >>> check_input_data([{"match": "uptime"}])
+        Traceback (most recent call last):
+        ...
+        ValueError: `input_data` rule 1 needs a `command` string
+
+    """
+    if not isinstance(input_data, list):
+        raise ValueError("`input_data` must be a list of rules")
+    for number, rule in enumerate(input_data, start=1):
+        if not isinstance(rule, dict):
+            raise ValueError(f"`input_data` rule {number} must be an object")
+        for field in ["command", "match"]:
+            if not isinstance(rule.get(field), str):
+                raise ValueError(f"`input_data` rule {number} needs a `{field}` string")
+        if "section" in rule and not isinstance(rule["section"], str):
+            raise ValueError(f"`input_data` rule {number}: `section` must be a string")
+
+
+class RowCollector:
+    """Writer collecting the rows of each check, in place of the `NdjsonWriter`."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def write(self, row, check: str = None):
+        self.rows.setdefault(check, []).append(row)
+
+
+class SearchService:
+    """State kept between the requests, and the search run for each of them.
+
+    `run_search` is the function running the checks, `load_inventory(device_filter)`
+    the one fetching the inventory of a device filter, and `settings` the arguments of
+    `run_search` shared by all the requests (client, logs, log cache, workers...).
+    The inventories of the last `max_inventories` device filters used are kept.
+    """
+
+    def __init__(
+        self,
+        run_search,
+        load_inventory,
+        device_filter: dict,
+        input_data: list = None,
+        max_inventories: int = MAX_INVENTORIES,
+        **settings,
+    ):
+        self.run_search = run_search
+        self.load_inventory = load_inventory
+        self.device_filter = device_filter
+        self.input_data = input_data
+        self.max_inventories = max_inventories
+        self.settings = settings
+        self.inventories = OrderedDict()
+        self.requests = 0
+        self.started = time.time()
+
+    def add_inventory(self, device_filter: dict, inventory):
+        key = json.dumps(device_filter, sort_keys=True)
+        self.inventories[key] = inventory
+        self.inventories.move_to_end(key)
+        while len(self.inventories) > self.max_inventories:
+            self.inventories.popitem(last=False)
+
+    def inventory(self, device_filter: dict):
+        """Return the inventory of the device filter, fetched on its first use (or once dropped)."""
+        key = json.dumps(device_filter, sort_keys=True)
+        if key in self.inventories:
+            self.inventories.move_to_end(key)
+            return self.inventories[key]
+        inventory = self.load_inventory(device_filter)
+        self.add_inventory(device_filter, inventory)
+        return inventory
+
+    def search(self, request: dict) -> dict:
+        """Run the checks of the request, raise ValueError with the `##ERR##` message if it's refused."""
+        checks = request.get("checks") or ["input-data"]
+        if isinstance(checks, str):
+            checks = [checks]
+        device_filter = request.get("device_filter", self.device_filter)
+        if not isinstance(checks, list) or not isinstance(device_filter, dict):
+            raise ValueError("`checks` must be a list of check names, and `device_filter` an IP Fabric filter")
+        input_data = request.get("input_data", self.input_data)
+        if "input_data" in request:
+            check_input_data(input_data)
+        self.requests += 1
+        collector = RowCollector()
+        output = io.StringIO()
+        start = time.perf_counter()
+        # what the checks print is captured, only the errors and warnings are returned
+        with contextlib.redirect_stdout(output):
+            try:
+                self.run_search(
+                    checks,
+                    ipf_devices=self.inventory(device_filter),
+                    device_filter=device_filter,
+                    input_data=input_data,
+                    verbose=bool(request.get("verbose")),
+                    writer=collector,
+                    display=False,
+                    **self.settings,
+                )
+            except SystemExit as exc:
+                text = output.getvalue()
+                raise ValueError(text[text.find("##ERR##"):].strip() or "search stopped") from exc
+        rows = collector.rows
+        if None in rows:
+            # with a single check, the rows are not tagged with the name of the check
+            rows = {checks[0]: rows.pop(None)}
+        return {
+            "result": {check: rows.get(check, []) for check in dict.fromkeys(checks)},
+            "warnings": [line for line in output.getvalue().splitlines() if line.startswith("##WARNING##")],
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def status(self) -> dict:
+        ipf_client, log_cache = self.settings.get("ipf_client"), self.settings.get("log_cache")
+        return {
+            "snapshot": ipf_client.snapshot_id if ipf_client else self.settings.get("archive"),
+            "inventories": {key: len(inventory) for key, inventory in self.inventories.items()},
+            "logs_in_memory": len(log_cache) if log_cache is not None else 0,
+            "memory_mb": round(log_cache.size / 1024 / 1024, 1) if log_cache is not None else 0,
+            "requests": self.requests,
+            "uptime": round(time.time() - self.started),
+        }
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front of the `SearchService` of the server."""
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/status":
+            self._reply(HTTPStatus.OK, self.server.service.status())
+        else:
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/search":
+            self._reply(HTTPStatus.NOT_FOUND, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            request = json.loads(body or "{}")
+            if not isinstance(request, dict):
+                raise ValueError("the request must be a JSON object")
+            response = self.server.service.search(request)
+        except ValueError as exc:
+            # including the json.JSONDecodeError of an invalid body
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+        except Exception as exc:
+            self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"})
+        else:
+            self._reply(HTTPStatus.OK, response)
+
+    def _reply(self, status: HTTPStatus, payload: dict):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # the client of a Unix socket has no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+
+def serve_checks(service: SearchService, address: str):
+    """Serve the requests of the service on the address (see `parse_address`), until interrupted."""
+    address = parse_address(address)
+    if isinstance(address, str):
+        if not hasattr(socketserver, "UnixStreamServer"):
+            print("##ERR## The Unix sockets are not available on this system, serve on a port instead.")
+            return
+        # the socket left by a previous service is replaced
+        with contextlib.suppress(FileNotFoundError):
+            if stat.S_ISSOCK(os.stat(address).st_mode):
+                os.unlink(address)
+        server = socketserver.UnixStreamServer(address, SearchRequestHandler)
+        where = f"unix socket {address}"
+    else:
+        server = HTTPServer(address, SearchRequestHandler)
+        where = f"http://{address[0]}:{address[1]}"
+    server.service = service
+    print(f"\nSERVING the checks on {where} (POST /search, GET /status), Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(address, str):
+            with contextlib.suppress(OSError):
+                os.unlink(address)
@@ -9,31 +9,34 @@ WARNING: you should make sure the SDK version matches your version of IP Fabric
 """
 
 import contextlib
+import importlib.util
 import json
 import os
+import re
 import sys
 
 import typer
 from dotenv import find_dotenv, load_dotenv
-from ipfabric import IPFClient
-from ipfabric.tools import DeviceConfigs
-
-from modules.logs_cve_2024_3400 import display_cve_2024_3400, search_cve_2024_3400
-from modules.logs_dhcp import display_dhcp_interfaces, search_dhcp_interfaces
-from modules.logs_ipf import display_log_compliance, download_logs, search_logs
-from modules.logs_macro_intf import display_interfaces_macro, search_interfaces_macro
-from modules.logs_password_encryption import (
-    display_password_encryption,
-    find_password_encryption,
-)
-from modules.logs_switchport import (
-    display_switchport_log_compliance,
-    search_switchport_logs,
+
+from modules.check_registry import iter_single_pass, load_function
+from modules.concurrency import record_outputs, time_budget, time_logs
+from modules.incremental import (
+    IncrementalState,
+    check_settings,
+    device_fingerprints,
+    get_config_hashes,
+    merge_reused,
+    snapshot_key,
 )
-from modules.logs_temperature import find_temperature
-from modules.logs_os_details import find_os_details
-from modules.logs_intf_last_counters import find_interfaces_last_counters
-from modules.logs_intf_pause_txrx import get_devices_with_fex, find_pause_txrx
+from modules.inventory import Inventory
+from modules.log_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_SIZE_MB, DEFAULT_MEMORY_MB, LogCache, MemoryLogCache
+from modules.patterns import pattern_cache_info
+from modules.profiling import PROFILER, phase
+from modules.result_writer import NdjsonWriter, is_ndjson_output
+
+# The modules of the checks, and their dependencies (pandas, tqdm, the IP Fabric SDK),
+# are imported when they are needed, not when the script starts: `--help`, or a run of
+# a single check, don't pay for the import of the others
 
 with contextlib.suppress(ImportError):
     from rich import print
@@ -98,11 +101,86 @@ def main(
         "-cve3400",
         help="Check for Palo Alto CVE-2024-3400 vulnerabilities (https://security.paloaltonetworks.com/CVE-2024-3400)",
     ),
+    input_data_search: bool = typer.Option(
+        False,
+        "--input-data",
+        "-input",
+        help="Search the INPUT_DATA of the .env file (default when no other check is selected)",
+    ),
     file_output: str = typer.Option(
         None,
         "--file-output",
         "-fo",
-        help="Write the output to a file",
+        help="Write the output to a file, in JSON, or in JSON lines written as the devices are parsed (.ndjson / .jsonl, .gz to compress)",
+    ),
+    download_workers: int = typer.Option(
+        None,
+        "--download-workers",
+        "-dw",
+        help="Number of logs downloaded in parallel (default: DOWNLOAD_WORKERS from the .env, or 1)",
+    ),
+    cache_dir: str = typer.Option(
+        None,
+        "--cache-dir",
+        help=f"Folder of the per-snapshot log cache (default: LOG_CACHE_DIR from the .env, or {DEFAULT_CACHE_DIR})",
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Do not read nor write the log cache, always download the logs",
+    ),
+    workers: int = typer.Option(
+        None,
+        "--workers",
+        "-w",
+        help="Number of processes parsing the logs (default: PARSE_WORKERS from the .env, or 1)",
+    ),
+    time_budget_seconds: float = typer.Option(
+        None,
+        "--time-budget",
+        help="Stop parsing a device after this many seconds, reported as TIMEOUT (default: PARSE_TIME_BUDGET from the .env, or none)",
+    ),
+    compress_logs: bool = typer.Option(
+        False,
+        "--compress-logs",
+        help="Keep the text of the logs compressed in memory, decompressed only when parsed",
+    ),
+    spool_logs: int = typer.Option(
+        None,
+        "--spool-logs",
+        help="Spool the logs of this size (MB) or more to temporary files, parsed through a memory map (0: all the logs)",
+    ),
+    archive: str = typer.Option(
+        None,
+        "--archive",
+        "-a",
+        help="Offline mode: read the logs and the inventory from a snapshot archive (tar/zip) instead of IP Fabric",
+    ),
+    incremental: str = typer.Option(
+        None,
+        "--incremental",
+        "-inc",
+        help="State file of the incremental runs: the devices unchanged since the previous run reuse their results",
+    ),
+    parquet: bool = typer.Option(
+        False,
+        "--parquet",
+        help="Export the temperature, OS details and pause counters checks to typed Parquet files instead of CSV (needs pyarrow)",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Report the time spent in each phase of the run, and the slowest devices to parse",
+    ),
+    profile_top: int = typer.Option(
+        10,
+        "--profile-top",
+        help="Number of the slowest devices listed by --profile",
+    ),
+    serve: str = typer.Option(
+        None,
+        "--serve",
+        help="Service mode: keep the client, the inventory and the logs in memory, and run the checks requested over HTTP, on [host:]port or a Unix socket path",
     ),
 ):
     """Script to look for a pattern, in a section, for a specific command output
@@ -121,151 +199,533 @@ def main(
             sys.exit()
         return json_data
 
+    PROFILER.enabled = profile
+    # With a JSON lines output, the rows are written as soon as they are found, not collected
+    stream_output = is_ndjson_output(file_output)
+    if parquet and stream_output:
+        # the JSON lines output replaces the CSV / Parquet files of the checks
+        print("##ERR## --parquet can't be used with a JSON lines output (.ndjson / .jsonl), use one or the other.")
+        sys.exit()
+    if parquet and importlib.util.find_spec("pyarrow") is None:
+        print("##ERR## The Parquet export needs pyarrow: `pip install pyarrow`")
+        sys.exit()
+
+    # Load environment variables
+    load_dotenv(find_dotenv(), override=True)
+    prompt_delimiter = os.getenv("PROMPT_DELIMITER")
+    device_filter = valid_json(os.getenv("DEVICES_FILTER", "{}"))
+    if download_workers is None:
+        download_workers = int(os.getenv("DOWNLOAD_WORKERS", 1))
+    if workers is None:
+        workers = int(os.getenv("PARSE_WORKERS", 1))
+    if time_budget_seconds is None:
+        time_budget_seconds = float(os.getenv("PARSE_TIME_BUDGET", 0))
+
+    if archive:
+        from modules.archive import ArchiveLogs
+
+        # Offline mode: everything is read from the archive, IP Fabric is not contacted,
+        # and there is no need to cache what is already on the disk
+        ipf_client = None
+        logs = ArchiveLogs(archive)
+        log_cache = None
+
+        def load_inventory(filters: dict):
+            return Inventory(logs.devices(filters))
+
+        try:
+            with phase("inventory"):
+                ipf_devices = load_inventory(device_filter)
+        except (FileNotFoundError, ValueError) as exc:
+            print(f"##ERR## Unable to read the inventory from the archive: {exc}")
+            sys.exit()
+    else:
+        from ipfabric import IPFClient
+        from ipfabric.tools import DeviceConfigs
+
+        # Getting data from IP Fabric and printing output
+        ipf_client = IPFClient(
+            base_url=os.getenv("IPF_URL"),
+            token=os.getenv("IPF_TOKEN"),
+            snapshot_id=os.getenv("IPF_SNAPSHOT", "$last"),
+            verify=(os.getenv("IPF_VERIFY", "False") == "True"),
+            timeout=os.getenv("IPF_TIMEOUT", 60)
+        )
+
+        logs = DeviceConfigs(client=ipf_client)
+        log_cache = None
+        if not no_cache:
+            log_cache = LogCache(
+                cache_dir or os.getenv("LOG_CACHE_DIR", DEFAULT_CACHE_DIR),
+                ipf_client.snapshot_id,
+                int(os.getenv("LOG_CACHE_MAX_MB", DEFAULT_MAX_SIZE_MB)),
+            )
+
+        def load_inventory(filters: dict):
+            return Inventory.from_client(ipf_client, filters)
+
+        # The inventory is fetched and indexed once, it's shared by all the checks
+        with phase("inventory"):
+            ipf_devices = load_inventory(device_filter)
+
+    if serve:
+        from modules.service import SearchService, serve_checks
+
+        # Service mode: the client, the inventories and the logs stay in memory, and the
+        # checks are run on request, the INPUT_DATA of the .env being the default rules
+        service = SearchService(
+            run_search,
+            load_inventory,
+            ipf_client=ipf_client,
+            logs=logs,
+            log_cache=MemoryLogCache(int(os.getenv("SERVICE_LOG_MEMORY_MB", DEFAULT_MEMORY_MB)), log_cache),
+            device_filter=device_filter,
+            prompt_delimiter=prompt_delimiter,
+            input_data=valid_json(os.getenv("INPUT_DATA")) if os.getenv("INPUT_DATA") else None,
+            download_workers=download_workers,
+            workers=workers,
+            time_budget_seconds=time_budget_seconds,
+            compress_logs=compress_logs,
+            spool_logs=spool_logs,
+            archive=archive,
+        )
+        service.add_inventory(device_filter, ipf_devices)
+        serve_checks(service, serve)
+        return
+
+    # The checks selected with the options, the INPUT_DATA search when there is none
+    selected_checks = [
+        name
+        for name, selected in {
+            "dhcp-interfaces": dhcp_intf,
+            "switchport-interfaces": switchport_intf,
+            "password-encryption": password_level,
+            "macro-interfaces": macro_intf,
+            "cve-2024-3400": cve_2024_3400,
+            "temperature": temperature,
+            "os-details": os_details,
+            "pause-counter-interfaces": pause_counter_interf,
+            "input-data": input_data_search,
+        }.items()
+        if selected
+    ] or ["input-data"]
+    input_data = valid_json(os.getenv("INPUT_DATA", "")) if "input-data" in selected_checks else None
+
+    writer = NdjsonWriter(file_output) if stream_output else None
+    try:
+        result = run_search(
+            selected_checks,
+            ipf_client=ipf_client,
+            ipf_devices=ipf_devices,
+            logs=logs,
+            device_filter=device_filter,
+            prompt_delimiter=prompt_delimiter,
+            input_data=input_data,
+            verbose=verbose,
+            writer=writer,
+            display=not file_output,
+            log_cache=log_cache,
+            download_workers=download_workers,
+            workers=workers,
+            time_budget_seconds=time_budget_seconds,
+            compress_logs=compress_logs,
+            spool_logs=spool_logs,
+            archive=archive,
+            incremental=incremental,
+            parquet=parquet,
+        )
+    finally:
+        # also when the run stops early (error, Ctrl+C): the rows found so far are kept
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        print(f"\nJSON LINES OUTPUT written to {file_output} ({writer.rows} rows)")
+    if verbose:
+        print(f"\nRegex pattern cache: {pattern_cache_info()}")
+
+    # Write the output to a file, if requested, in CSV or JSON format
+    # if file_output and file_output.endswith("csv"):
+    #     # Write the output to a CSV file
+    #     import csv
+    #     with open(file_output, "w") as file:
+    #         writer = csv.DictWriter(file, fieldnames=result[0].keys())
+    #         writer.writeheader()
+    #         writer.writerows(result)
+    #     print(f"\nCSV OUTPUT written to {file_output}")
+    # el
+    if file_output and not stream_output:
+        # Write the output to a JSON file
+        with phase("output"), open(file_output, "w") as file:
+            json.dump(result, file, indent=4)
+        print(f"\nJSON OUTPUT written to {file_output}")
+    if profile:
+        PROFILER.report(profile_top)
+
+
+def run_search(
+    selected_checks: list,
+    ipf_client,
+    ipf_devices,
+    logs,
+    device_filter: dict,
+    prompt_delimiter: str,
+    input_data: list = None,
+    verbose: bool = False,
+    writer=None,
+    display: bool = True,
+    log_cache=None,
+    download_workers: int = 1,
+    workers: int = 1,
+    time_budget_seconds: float = 0,
+    compress_logs: bool = False,
+    spool_logs: int = None,
+    archive: str = None,
+    incremental: str = None,
+    parquet: bool = False,
+):
+    """Run the selected checks on the logs of `ipf_devices`, and return their result.
+
+    `logs` is where the logs are read from (`DeviceConfigs`, or `ArchiveLogs` with
+    `archive`, `ipf_client` being None). With a `writer` (`NdjsonWriter`), the rows
+    are written to it as the devices are parsed instead of being returned.
+    With a single check, the result is the one of this check, otherwise it's
+    `{check: result}`.
+    """
+
+    from modules.logs_ipf import group_rules, iter_logs, lint_rules
+
     def get_logs_supported_devices(ipf_devices, supported_families):
         # Download log files for matching hostnames
         print(
             f"\nDOWNLOADING relevant log files, checking {len(ipf_devices)} devices\n",
             end="",
         )
-        log_list = download_logs(logs, ipf_devices, supported_families)
-        # Search for specific strings in the log files
-        print(f"\nSEARCHING through {len(log_list)} log files")
-        return log_list
+        # Search for specific strings in the log files, each log is parsed as soon as
+        # it is downloaded, and released afterwards
+        print("\nSEARCHING through the log files as they are downloaded")
+        return PROFILER.timed_iter(
+            iter_logs(logs, ipf_devices, supported_families, download_workers, log_cache, compress_logs, spool_logs),
+            "download",
+        )
 
-    # Load environment variables
-    load_dotenv(find_dotenv(), override=True)
-    prompt_delimiter = os.getenv("PROMPT_DELIMITER")
-    device_filter = valid_json(os.getenv("DEVICES_FILTER", "{}"))
+    stream_output = writer is not None
 
-    # Getting data from IP Fabric and printing output
-    ipf_client = IPFClient(
-        base_url=os.getenv("IPF_URL"),
-        token=os.getenv("IPF_TOKEN"),
-        snapshot_id=os.getenv("IPF_SNAPSHOT", "$last"),
-        verify=(os.getenv("IPF_VERIFY", "False") == "True"),
-        timeout=os.getenv("IPF_TIMEOUT", 60)
-    )
+    def run_dhcp_interfaces(log_list):
+        from modules.logs_dhcp import iter_dhcp_interfaces, search_dhcp_interfaces
+
+        return (iter_dhcp_interfaces if stream_output else search_dhcp_interfaces)(
+            ipf_client, log_list, prompt_delimiter, verbose, workers, sn_list=run_devices["dhcp-interfaces"]
+        )
+
+    def run_switchport_interfaces(log_list):
+        from modules.logs_switchport import iter_switchport_interfaces, search_switchport_logs
 
-    logs = DeviceConfigs(client=ipf_client)
-    ipf_devices = ipf_client.inventory.devices.all(filters=device_filter)
-    # Call the DHCP function, if the option is selected
-    if dhcp_intf:
-        supported_families = ["ios-xe", "ios", "ios-xr", "nx-os"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        result = search_dhcp_interfaces(ipf_client, log_list, prompt_delimiter, verbose)
-        if not file_output:
-            display_dhcp_interfaces(result)
-    # Call the switchport function, if the option is selected
-    elif switchport_intf:
-        supported_families = ["ios-xe", "ios", "ios-xr", "nx-os"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
         # Get the list of switchport interfaces filtered by the device_filter if it's based on hostname
-        if "hostname" in device_filter.keys():
-            print(
-                f" and matching with all {ipf_client.technology.interfaces.switchport.count(filters=device_filter)} interfaces",
-            )
-            switchport_interfaces = ipf_client.technology.interfaces.switchport.all(
-                columns=["hostname", "intName"],
-                filters=device_filter,
-            )
-        # Otherwise, we get the list of all switchport interfaces, as we can't filter.
-        else:
-            print(f" and matching with all {ipf_client.technology.interfaces.switchport.count()} interfaces")
-            switchport_interfaces = ipf_client.technology.interfaces.switchport.all(
-                columns=["hostname", "intName"],
-            )  # ,filters=device_filter)
-        result = search_switchport_logs(log_list, prompt_delimiter, switchport_interfaces, verbose)
-        if not file_output:
-            display_switchport_log_compliance(result)
-    elif password_level:
-        supported_families = ["ios-xe", "ios", "ios-xr", "nx-os", "eos"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        result = find_password_encryption(ipf_client, ipf_devices, log_list, prompt_delimiter, verbose)
-        if not file_output:
-            display_password_encryption(result)
-    elif macro_intf:
-        supported_families = ["ios-xe", "ios"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        result = search_interfaces_macro(ipf_client, ipf_devices, log_list, prompt_delimiter, verbose)
-        if not file_output:
-            display_interfaces_macro(result)
-    elif cve_2024_3400:
-        supported_families = ["pan-os"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        result = search_cve_2024_3400(
+        with phase("api: switchport"):
+            if "hostname" in device_filter.keys():
+                print(
+                    f" and matching with all {ipf_client.technology.interfaces.switchport.count(filters=device_filter)} interfaces",
+                )
+                switchport_interfaces = ipf_client.technology.interfaces.switchport.all(
+                    columns=["hostname", "intName"],
+                    filters=device_filter,
+                )
+            # Otherwise, we get the list of all switchport interfaces, as we can't filter.
+            else:
+                print(f" and matching with all {ipf_client.technology.interfaces.switchport.count()} interfaces")
+                switchport_interfaces = ipf_client.technology.interfaces.switchport.all(
+                    columns=["hostname", "intName"],
+                )  # ,filters=device_filter)
+        return (iter_switchport_interfaces if stream_output else search_switchport_logs)(
+            log_list, prompt_delimiter, switchport_interfaces, verbose, workers
+        )
+
+    def run_password_encryption(log_list):
+        from modules.logs_password_encryption import find_password_encryption, iter_password_encryption
+
+        return (iter_password_encryption if stream_output else find_password_encryption)(
+            ipf_client, ipf_devices, log_list, prompt_delimiter, verbose, workers
+        )
+
+    def run_macro_interfaces(log_list):
+        from modules.logs_macro_intf import iter_interfaces_macro, search_interfaces_macro
+
+        return (iter_interfaces_macro if stream_output else search_interfaces_macro)(
+            ipf_client, ipf_devices, log_list, prompt_delimiter, verbose, workers
+        )
+
+    def run_cve_2024_3400(log_list):
+        from modules.logs_cve_2024_3400 import iter_cve_2024_3400, search_cve_2024_3400
+
+        return (iter_cve_2024_3400 if stream_output else search_cve_2024_3400)(
             ipf_client=ipf_client,
             ipf_devices=ipf_devices,
             log_list=log_list,
             prompt_delimiter=prompt_delimiter,
             verbose=verbose,
+            workers=workers,
         )
-        if not file_output:
-            display_cve_2024_3400(result)
-    elif temperature:
-        # supported_families = ["ios-xe", "ios", "ios-xr", "nx-os", "aci", "juniper", "arubasw"]
-        supported_families = ["nx-os", "aci", "ios-xe", "junos"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        result = find_temperature(
+
+    def run_temperature(log_list):
+        from modules.logs_temperature import find_temperature, iter_temperature
+
+        if stream_output:
+            return iter_temperature(ipf_devices, log_list, prompt_delimiter, verbose, workers)
+        return find_temperature(
             ipf_devices=ipf_devices,
             log_list=log_list,
             prompt_delimiter=prompt_delimiter,
             verbose=verbose,
+            workers=workers,
+            file_format="parquet" if parquet else "csv",
         )
-    elif os_details:
-        supported_families = ["arubacx", "arubasw"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        result = find_os_details(
+
+    def run_os_details(log_list):
+        from modules.logs_os_details import find_os_details, iter_os_details
+
+        if stream_output:
+            return iter_os_details(ipf_devices, log_list, prompt_delimiter, verbose, workers)
+        return find_os_details(
             ipf_devices=ipf_devices,
             log_list=log_list,
             prompt_delimiter=prompt_delimiter,
             verbose=verbose,
+            workers=workers,
+            file_format="parquet" if parquet else "csv",
         )
-    elif pause_counter_interf:
-        # We only want to check devices with FEX modules
-        devices_with_fex = get_devices_with_fex(ipf_client, ipf_devices)
-        supported_families = ["nx-os"]
-        log_list = get_logs_supported_devices(devices_with_fex, supported_families)
-        result = find_pause_txrx(
-            ipf_devices=devices_with_fex,
+
+    def run_pause_counter_interfaces(log_list):
+        from modules.logs_intf_pause_txrx import find_pause_txrx, iter_pause_txrx
+
+        if stream_output:
+            return iter_pause_txrx(ipf_devices, log_list, prompt_delimiter, verbose, workers)
+        return find_pause_txrx(
+            ipf_devices=ipf_devices,
             log_list=log_list,
             prompt_delimiter=prompt_delimiter,
             verbose=verbose,
+            workers=workers,
+            file_format="parquet" if parquet else "csv",
         )
-    # elif used_counter_interf:
-    #     # supported_families = ["ios-xe", "ios", "ios-xr", "nx-os", "aci", "juniper", "arubasw"]
-    #     supported_families = ["nx-os", "aci", "ios-xe"]
-    #     log_list = get_logs_supported_devices(ipf_devices, supported_families)
-    #     result = find_interfaces_last_counters(
-    #         ipf_devices=ipf_devices,
-    #         log_list=log_list,
-    #         prompt_delimiter=prompt_delimiter,
-    #         verbose=verbose,
-    #     )
-    
-    # Otherwise, we perform the search as per the INPUT_DATA in the .env file
-    else:
-        supported_families = ["ios-xe", "ios", "ios-xr", "nx-os", "eos"]
-        log_list = get_logs_supported_devices(ipf_devices, supported_families)
-        input_data = valid_json(os.getenv("INPUT_DATA", ""))
-        result = search_logs(input_data, log_list, prompt_delimiter, verbose)
-        if not file_output:
-            display_log_compliance(result)
 
-    # Write the output to a file, if requested, in CSV or JSON format
-    # if file_output and file_output.endswith("csv"):
-    #     # Write the output to a CSV file
-    #     import csv
-    #     with open(file_output, "w") as file:
-    #         writer = csv.DictWriter(file, fieldnames=result[0].keys())
-    #         writer.writeheader()
-    #         writer.writerows(result)
-    #     print(f"\nCSV OUTPUT written to {file_output}")
-    # el
-    if file_output:
-        # Write the output to a JSON file
-        with open(file_output, "w") as file:
-            json.dump(result, file, indent=4)
-        print(f"\nJSON OUTPUT written to {file_output}")
+    def run_input_data(log_list):
+        from modules.logs_ipf import iter_search_results, search_logs
+
+        return (iter_search_results if stream_output else search_logs)(
+            input_data, log_list, prompt_delimiter, verbose, workers
+        )
+
+    # All the checks available: the families supported, the function running the
+    # check on a list of logs, the one displaying its result, whether it needs other
+    # tables of IP Fabric than the inventory (not in an archive), whether its output
+    # only depends on the configuration (incremental runs), and for the checks parsing
+    # nothing but the log, their per-log function. The functions are given as
+    # "module:function", their module being only imported if the check is selected
+    checks = {
+        "dhcp-interfaces": {
+            "families": ["ios-xe", "ios", "ios-xr", "nx-os"],
+            "run": run_dhcp_interfaces,
+            "api": True,
+            "display": "modules.logs_dhcp:display_dhcp_interfaces",
+        },
+        "switchport-interfaces": {
+            "families": ["ios-xe", "ios", "ios-xr", "nx-os"],
+            "run": run_switchport_interfaces,
+            "api": True,
+            "display": "modules.logs_switchport:display_switchport_log_compliance",
+        },
+        "password-encryption": {
+            "families": ["ios-xe", "ios", "ios-xr", "nx-os", "eos"],
+            "run": run_password_encryption,
+            "parser": "modules.logs_password_encryption:password_encryption",
+            "config": True,
+            "display": "modules.logs_password_encryption:display_password_encryption",
+        },
+        "macro-interfaces": {
+            "families": ["ios-xe", "ios"],
+            "run": run_macro_interfaces,
+            "parser": "modules.logs_macro_intf:interfaces_macro",
+            "config": True,
+            "display": "modules.logs_macro_intf:display_interfaces_macro",
+        },
+        "cve-2024-3400": {
+            "families": ["pan-os"],
+            "run": run_cve_2024_3400,
+            "parser": "modules.logs_cve_2024_3400:cve_2024_3400",
+            "config": True,
+            "display": "modules.logs_cve_2024_3400:display_cve_2024_3400",
+        },
+        "temperature": {
+            # "families": ["ios-xe", "ios", "ios-xr", "nx-os", "aci", "juniper", "arubasw"],
+            "families": ["nx-os", "aci", "ios-xe", "junos"],
+            "run": run_temperature,
+            "parser": "modules.logs_temperature:temperature",
+            "display": None,
+        },
+        "os-details": {
+            "families": ["arubacx", "arubasw"],
+            "run": run_os_details,
+            "parser": "modules.logs_os_details:os_details",
+            "display": None,
+        },
+        "pause-counter-interfaces": {
+            "families": ["nx-os"],
+            "run": run_pause_counter_interfaces,
+            "parser": "modules.logs_intf_pause_txrx:pause_txrx",
+            "api": True,
+            "display": None,
+        },
+        # used-counter-interfaces: find_interfaces_last_counters, families ["nx-os", "aci", "ios-xe"]
+        # Otherwise, we perform the search as per the INPUT_DATA in the .env file
+        "input-data": {
+            "families": ["ios-xe", "ios", "ios-xr", "nx-os", "eos"],
+            "run": run_input_data,
+            "parser": "modules.logs_ipf:search_log",
+            "display": "modules.logs_ipf:display_log_compliance",
+        },
+    }
+    if unknown_checks := [name for name in selected_checks if name not in checks]:
+        print(f"##ERR## Unknown check(s): {', '.join(unknown_checks)}. Available: {', '.join(checks)}")
+        sys.exit()
+    # the checks are run in the order of the table
+    selected_checks = [name for name in checks if name in selected_checks]
+    if "input-data" in selected_checks:
+        if not input_data:
+            print("##ERR## The input-data check needs the rules of the `INPUT_DATA`.")
+            sys.exit()
+        # the regex of the rules are checked before anything is downloaded
+        try:
+            rule_problems = lint_rules(input_data)
+        except re.error as exc:
+            print(f"##ERR## The `INPUT_DATA` contains an invalid regex: {exc}")
+            sys.exit()
+        for rule, problem in rule_problems:
+            print(f"##WARNING## INPUT_DATA rule {rule.get('ref', rule)}, `section` {rule['section']!r}: {problem}")
+    if archive and (api_checks := [name for name in selected_checks if checks[name].get("api")]):
+        print(f"##ERR## {', '.join(api_checks)} need(s) the IP Fabric API, and can't run on an archive.")
+        sys.exit()
+
+    # Serial numbers of the devices relevant for each check
+    check_devices = {}
+    for name in selected_checks:
+        devices = ipf_devices
+        if name == "pause-counter-interfaces":
+            # We only want to check devices with FEX modules
+            with phase("api: fex"):
+                devices = load_function("modules.logs_intf_pause_txrx:get_devices_with_fex")(ipf_client, ipf_devices)
+        check_devices[name] = {device["sn"] for device in devices if device["family"] in checks[name]["families"]}
+
+    # Incremental run: the devices unchanged since the previous run are not downloaded,
+    # their previous output is reused by each check
+    reused_outputs = {name: {} for name in selected_checks}
+    if incremental:
+        state = IncrementalState(incremental)
+        snapshot = snapshot_key(ipf_client, archive)
+        if archive:
+            fingerprints = device_fingerprints(
+                ipf_devices, log_sizes={device["sn"]: logs.log_size(device["sn"]) for device in ipf_devices}
+            )
+            config_known = True
+        else:
+            with phase("api: config hashes"):
+                config_hashes = get_config_hashes(ipf_client)
+            fingerprints = device_fingerprints(ipf_devices, config_hashes=config_hashes)
+            config_known = config_hashes is not None
+        # The fingerprint doesn't follow the operational state (temperature, counters...):
+        # these checks are bound to the snapshot, and only reuse the outputs of this one
+        snapshot_bound = [name for name in selected_checks if not (checks[name].get("config") and config_known)]
+        settings = {
+            name: check_settings(
+                name,
+                prompt_delimiter,
+                verbose,
+                input_data if name == "input-data" else None,
+                snapshot if name in snapshot_bound else None,
+            )
+            for name in selected_checks
+        }
+        if snapshot_bound and state.snapshot_id is not None and state.snapshot_id != snapshot:
+            print(f"\nINCREMENTAL run: new snapshot, {', '.join(snapshot_bound)} run(s) on all the devices")
+        for name in selected_checks:
+            reused_outputs[name] = state.reusable_outputs(
+                name, settings[name], {sn: fingerprints[sn] for sn in check_devices[name]}
+            )
+        reused_devices = set().union(*(outputs.keys() for outputs in reused_outputs.values()))
+        print(f"\nINCREMENTAL run: reusing the previous results of {len(reused_devices)} unchanged devices")
+    run_devices = {name: check_devices[name] - reused_outputs[name].keys() for name in selected_checks}
+
+    # Each log is downloaded once, for all the selected checks
+    all_check_devices = set().union(*run_devices.values())
+    supported_families = list({family for name in selected_checks for family in checks[name]["families"]})
+    log_list = get_logs_supported_devices(
+        [device for device in ipf_devices if device["sn"] in all_check_devices],
+        supported_families,
+    )
+
+    # The checks parsing nothing but the log, with their per-log function and its
+    # arguments after the log: with several checks, they are evaluated in a single pass
+    def parser_arguments(name: str) -> tuple:
+        if name == "input-data":
+            return input_data, prompt_delimiter, verbose, group_rules(input_data)
+        return (prompt_delimiter,)
+
+    single_pass = [name for name in selected_checks if "parser" in checks[name]]
+    if len(single_pass) < 2:
+        single_pass = []
+    if len(selected_checks) > 1 and len(single_pass) < len(selected_checks):
+        # the logs are kept in memory to be handed to every check (see --compress-logs)
+        log_list = list(log_list)
+
+    # Each log is visited once for all the checks of the single pass, which keep their
+    # outputs only: the logs are not held in memory for them
+    pass_outputs = {}
+    if single_pass:
+        print(f"\nPARSING the logs once for {', '.join(single_pass)}")
+        pass_outputs = {name: {} for name in single_pass}
+        timing = time_logs(PROFILER.device_timer("single pass")) if PROFILER.enabled else contextlib.nullcontext()
+        with phase("parse: single pass"), timing, time_budget(time_budget_seconds):
+            parsers = {name: (load_function(checks[name]["parser"]), parser_arguments(name)) for name in single_pass}
+            for sn, outputs in iter_single_pass(log_list, parsers, run_devices, workers):
+                for name, output in outputs.items():
+                    pass_outputs[name][sn] = output
+
+    result = {}
+    for name in selected_checks:
+        check = checks[name]
+        devices = [device for device in ipf_devices if device["sn"] in check_devices[name]]
+        if len(selected_checks) > 1:
+            print(f"\n=========== {name.upper()} ===========")
+        if name in pass_outputs:
+            # already parsed, the check gets the outputs of the single pass in place of the logs
+            check_log_list = merge_reused([], devices, {**reused_outputs[name], **pass_outputs[name]})
+        else:
+            if len(selected_checks) > 1:
+                check_log_list = [log for log in log_list if log["sn"] in run_devices[name]]
+            else:
+                check_log_list = log_list
+            if incremental:
+                check_log_list = merge_reused(check_log_list, devices, reused_outputs[name])
+        recording = contextlib.nullcontext()
+        if incremental:
+            recording = record_outputs(state.recorder(name, settings[name], fingerprints))
+        timing = time_logs(PROFILER.device_timer(name)) if PROFILER.enabled else contextlib.nullcontext()
+        with phase(f"parse: {name}"), timing, recording, time_budget(time_budget_seconds):
+            if stream_output:
+                # each row is written as soon as its device is parsed
+                for row in check["run"](check_log_list):
+                    with phase("output"):
+                        writer.write(row, name if len(selected_checks) > 1 else None)
+            else:
+                result[name] = check["run"](check_log_list)
+        if display and not stream_output and check["display"]:
+            with phase("output"):
+                load_function(check["display"])(result[name])
+    if incremental:
+        state.save(snapshot)
+    # With a single check, the output is the result of this check, as it has always been
+    if len(selected_checks) == 1 and not stream_output:
+        result = result[selected_checks[0]]
+    return result
 
 
 if __name__ == "__main__":
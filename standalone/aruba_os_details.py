@@ -12,7 +12,7 @@ Usage:
 
 Configuration is read from the `.env` file (same variables as the main project):
     IPF_URL, IPF_TOKEN, IPF_VERIFY, IPF_SNAPSHOT, IPF_TIMEOUT,
-    PROMPT_DELIMITER, DEVICES_FILTER (optional)
+    PROMPT_DELIMITER, DEVICES_FILTER (optional), DOWNLOAD_WORKERS (optional)
 
 Output: prints the results and writes `os_details.csv`.
 
@@ -24,6 +24,7 @@ import csv
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import find_dotenv, load_dotenv
 from ipfabric import IPFClient
@@ -93,15 +94,27 @@ def extract_os_detail(log, family, prompt_delimiter):
     }
 
 
-def download_aruba_logs(logs, ipf_devices):
-    """Download the IP Fabric text log for each supported Aruba device."""
+def download_aruba_logs(logs, ipf_devices, workers=1):
+    """Download the IP Fabric text log for each supported Aruba device.
+
+    `workers` logs are downloaded at the same time; the output, and the progress
+    printed as the logs come in, keep the order of `ipf_devices`.
+    """
     log_list = []
     total = len(ipf_devices)
-    for index, host in enumerate(ipf_devices, start=1):
-        if host["family"] not in SUPPORTED_FAMILIES:
-            continue
-        print(f"Downloading logs ({index}/{total}): {host['hostname']}")
-        if dev_log := logs.get_text_log(host):
+    aruba_devices = [
+        (index, host)
+        for index, host in enumerate(ipf_devices, start=1)
+        if host["family"] in SUPPORTED_FAMILIES
+    ]
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        downloaded = executor.map(logs.get_text_log, [host for _, host in aruba_devices])
+        # the logs are yielded in order, the progress is printed from this thread
+        for (index, host), dev_log in zip(aruba_devices, downloaded):
+            print(f"Downloaded logs ({index}/{total}): {host['hostname']}")
+            if not dev_log:
+                continue
             log_list.append(
                 {
                     "hostname": host["hostname"],
@@ -149,7 +162,7 @@ def main():
     ipf_devices = ipf_client.inventory.devices.all(filters=device_filter)
     print(f"\nChecking {len(ipf_devices)} devices for families {SUPPORTED_FAMILIES}\n")
 
-    log_list = download_aruba_logs(logs, ipf_devices)
+    log_list = download_aruba_logs(logs, ipf_devices, int(os.getenv("DOWNLOAD_WORKERS", 1)))
     print(f"\nParsing {len(log_list)} Aruba log file(s)")
 
     result = [